@@ -3,11 +3,11 @@ import logging
 import logging.handlers
 import os
 
-from aiohttp import ClientSession
 from dotenv import load_dotenv
 
 import src.bot.utils.logging as lutils
 from src.bot.core.DiscordBot import DiscordBot
+from src.bot.utils.http import HttpClient
 
 
 async def main():
@@ -52,8 +52,8 @@ async def main():
     discord_logger.addHandler(console_handler)
     fc_logger.addHandler(console_handler)
 
-    # start async session
-    async with ClientSession() as web_client:
+    # start the shared (pooled) http client
+    async with HttpClient() as web_client:
         async with DiscordBot(
             command_prefix=os.getenv("BOT_PREFIX", "f!"),
             when_mentioned=True,
@@ -5,9 +5,11 @@ import time
 from typing import Optional
 
 import discord
-from aiohttp import ClientSession
 from discord.ext import commands
 
+from src.bot.core.MessageRouter import MessageRouter
+from src.bot.utils.http import HttpClient
+
 logger = logging.getLogger("bot.core")
 
 
@@ -17,7 +19,7 @@ class DiscordBot(commands.Bot):  # Mudamos para herdar de commands.Bot
         *args,
         command_prefix: str = "s!",
         when_mentioned: bool = False,
-        web_client: ClientSession,
+        web_client: HttpClient,
         intents: Optional[discord.Intents] = None,
         testing_guild_id: Optional[int] = None,
     ):
@@ -34,6 +36,7 @@ class DiscordBot(commands.Bot):  # Mudamos para herdar de commands.Bot
         )  # Usamos commands.Bot
         self.web_client = web_client
         self.testing_guild_id = testing_guild_id
+        self.router = MessageRouter(self)
 
     async def on_tree_error(
         self,
@@ -77,6 +80,11 @@ class DiscordBot(commands.Bot):  # Mudamos para herdar de commands.Bot
         self.tree.on_error = self.on_tree_error
         logger.info(f"Logged in as {self.user}")
 
+    async def on_message(self, message: discord.Message):
+        # só as mensagens relevantes chegam aos módulos, como eventos próprios
+        self.router.dispatch(message)
+        await self.process_commands(message)
+
     async def on_guild_join(self, guild: discord.Guild):
         logger.info(f"Joined {guild.name}")
 
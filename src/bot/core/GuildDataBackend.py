@@ -0,0 +1,266 @@
+import abc
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import typing
+
+from pymongo import UpdateOne, errors
+
+from src.bot.utils.database import AsyncDatabaseClient
+
+BACKENDS = ("mongo", "memory", "sqlite")
+
+# anything a backend may raise when the storage itself fails
+STORAGE_ERRORS = (errors.PyMongoError, sqlite3.Error)
+
+
+def _resolve(doc: dict, path: str, create: bool = False):
+    """Returns (parent dict, leaf key) of a dotted path, or (None, leaf) if absent."""
+    *parents, leaf = path.split(".")
+    target = doc
+    for part in parents:
+        if create and not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return None, leaf
+    return target, leaf
+
+
+def apply_update(doc: dict, update: dict):
+    """Applies a (dotted path) Mongo update document on a dict, like Mongo would."""
+    for path, value in update.get("$set", {}).items():
+        target, leaf = _resolve(doc, path, create=True)
+        target[leaf] = value
+    for path in update.get("$unset", {}):
+        target, leaf = _resolve(doc, path)
+        if target is not None:
+            target.pop(leaf, None)
+    for path, value in update.get("$addToSet", {}).items():
+        target, leaf = _resolve(doc, path, create=True)
+        items = target.setdefault(leaf, [])
+        items.extend(item for item in value["$each"] if item not in items)
+    for path, value in update.get("$pull", {}).items():
+        target, leaf = _resolve(doc, path)
+        if target is not None and isinstance(target.get(leaf), list):
+            target[leaf] = [item for item in target[leaf] if item not in value["$in"]]
+
+
+class GuildDataBackend(abc.ABC):
+    """
+    Storage behind a GuildDataManager: one document per guild (holding GUILD_ID),
+    changed through Mongo-style update documents ($set, $unset, $addToSet, $pull
+    on dotted paths). Non-Mongo backends interpret them with `apply_update`.
+    """
+
+    supports_watch = False
+
+    @abc.abstractmethod
+    def load_all(self) -> typing.AsyncIterator[dict]:
+        """Yields every guild document."""
+
+    @abc.abstractmethod
+    async def load_many(self, guild_ids: list[int]) -> dict[int, dict]:
+        """Returns {guild_id: document} for the given guilds that have one."""
+
+    @abc.abstractmethod
+    async def apply(self, updates: list[tuple[int, dict]]):
+        """Applies (guild_id, update document) pairs in order, upserting guilds."""
+
+    def watch(self, resume_after=None):
+        """Change stream over the stored documents (only if supports_watch)."""
+        raise NotImplementedError(f"{type(self).__name__} has no change stream")
+
+    async def close(self):
+        pass
+
+
+class MongoBackend(GuildDataBackend):
+    """A motor collection, one document per guild."""
+
+    supports_watch = True
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def load_all(self):
+        async for doc in self.collection.find({}):
+            yield doc
+
+    async def load_many(self, guild_ids: list[int]) -> dict[int, dict]:
+        docs = {}
+        async for doc in self.collection.find({"GUILD_ID": {"$in": guild_ids}}):
+            docs[doc["GUILD_ID"]] = doc
+        return docs
+
+    async def apply(self, updates: list[tuple[int, dict]]):
+        if len(updates) == 1:
+            guild_id, update = updates[0]
+            await self.collection.update_one(
+                {"GUILD_ID": guild_id}, update, upsert=True
+            )
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne({"GUILD_ID": guild_id}, update, upsert=True)
+                for guild_id, update in updates
+            ],
+            ordered=True,
+        )
+
+    def watch(self, resume_after=None):
+        return self.collection.watch(
+            full_document="updateLookup", resume_after=resume_after
+        )
+
+
+class MemoryBackend(GuildDataBackend):
+    """
+    Process-local storage, for tests, benchmarks and throwaway deployments.
+    Stores are shared by name so a reloaded module finds its data again.
+    """
+
+    _stores = {}  # name: {guild_id: document}
+
+    def __init__(self, name: str):
+        self.docs = MemoryBackend._stores.setdefault(name, {})
+
+    async def load_all(self):
+        for doc in list(self.docs.values()):
+            yield copy.deepcopy(doc)
+
+    async def load_many(self, guild_ids: list[int]) -> dict[int, dict]:
+        return {
+            gid: copy.deepcopy(self.docs[gid]) for gid in guild_ids if gid in self.docs
+        }
+
+    async def apply(self, updates: list[tuple[int, dict]]):
+        for guild_id, update in updates:
+            doc = self.docs.setdefault(guild_id, {"GUILD_ID": guild_id})
+            apply_update(doc, copy.deepcopy(update))
+
+
+class SQLiteBackend(GuildDataBackend):
+    """
+    Embedded storage on a SQLite file in WAL mode, one row per guild/key with
+    JSON encoded values. Queries run in a worker thread to keep the loop free.
+    """
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS guild_data (
+                collection TEXT NOT NULL,
+                guild_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (collection, guild_id, key)
+            ) WITHOUT ROWID
+            """)
+
+    def _rows_to_docs(self, rows) -> dict[int, dict]:
+        docs = {}
+        for guild_id, key, value in rows:
+            doc = docs.setdefault(guild_id, {"GUILD_ID": guild_id})
+            doc[key] = json.loads(value)
+        return docs
+
+    def _query(self, sql: str, params: tuple) -> dict[int, dict]:
+        with self._lock:
+            return self._rows_to_docs(self._conn.execute(sql, params).fetchall())
+
+    async def load_all(self):
+        docs = await asyncio.to_thread(
+            self._query,
+            "SELECT guild_id, key, value FROM guild_data WHERE collection = ?",
+            (self.name,),
+        )
+        for doc in docs.values():
+            yield doc
+
+    async def load_many(self, guild_ids: list[int]) -> dict[int, dict]:
+        return await asyncio.to_thread(
+            self._query,
+            "SELECT guild_id, key, value FROM guild_data WHERE collection = ? "
+            "AND guild_id IN (SELECT value FROM json_each(?))",
+            (self.name, json.dumps(guild_ids)),
+        )
+
+    def _apply_sync(self, updates: list[tuple[int, dict]]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for guild_id, update in updates:
+                    # only the top level keys touched by the update are rewritten
+                    keys = {
+                        path.split(".")[0]
+                        for fields in update.values()
+                        for path in fields
+                    }
+                    rows = self._conn.execute(
+                        "SELECT guild_id, key, value FROM guild_data "
+                        "WHERE collection = ? AND guild_id = ? "
+                        "AND key IN (SELECT value FROM json_each(?))",
+                        (self.name, guild_id, json.dumps(list(keys))),
+                    ).fetchall()
+                    doc = self._rows_to_docs(rows).get(guild_id, {})
+                    apply_update(doc, update)
+
+                    self._conn.executemany(
+                        "INSERT INTO guild_data (collection, guild_id, key, value) "
+                        "VALUES (?, ?, ?, ?) ON CONFLICT (collection, guild_id, key) "
+                        "DO UPDATE SET value = excluded.value",
+                        [
+                            (
+                                self.name,
+                                guild_id,
+                                key,
+                                json.dumps(doc[key], default=str),
+                            )
+                            for key in keys
+                            if key in doc
+                        ],
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM guild_data "
+                        "WHERE collection = ? AND guild_id = ? AND key = ?",
+                        [(self.name, guild_id, key) for key in keys if key not in doc],
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def apply(self, updates: list[tuple[int, dict]]):
+        await asyncio.to_thread(self._apply_sync, updates)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_backend(name: str, kind: typing.Optional[str] = None) -> GuildDataBackend:
+    """
+    Builds the backend selected by env GDM_BACKEND (mongo, memory or sqlite) for the
+    collection `name`. SQLite uses the file at env GDM_SQLITE_PATH.
+    """
+    if kind is None:
+        kind = os.getenv("GDM_BACKEND", "mongo").lower()
+
+    if kind == "mongo":
+        return MongoBackend(AsyncDatabaseClient().get_collection(name))
+    if kind == "memory":
+        return MemoryBackend(name)
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("GDM_SQLITE_PATH", "voxbot.sqlite3"), name)
+    raise ValueError(f"Invalid GDM backend: {kind} (expected one of {BACKENDS})")
@@ -1,68 +1,616 @@
+import asyncio
 import logging
+import os
+import time
 import typing
+from collections import OrderedDict
 
-from pymongo.collection import Collection
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo import errors
+
+import src.bot.core.GuildDataBackend as backends
+from src.bot.utils.snapshot import freeze, read_snapshot, write_snapshot
+
+# raised by servers that cannot open change streams (standalone mongod)
+CHANGE_STREAM_UNSUPPORTED_CODES = (40573, 40324)
+
+PRELOAD_MODES = ("all", "guilds", "none")
+IN_QUERY_CHUNK = 1000  # guild ids per $in query
+NEGATIVE_CACHE_SIZE = 10000  # guild ids remembered as having no document
+
+
+def _paths_conflict(a: str, b: str) -> bool:
+    """Two update paths conflict when one is the other or one of its parents."""
+    return a == b or a.startswith(f"{b}.") or b.startswith(f"{a}.")
+
+
+# modifier holding the values of each array operator
+ARRAY_MODIFIERS = {"$addToSet": "$each", "$pull": "$in"}
+
+
+def _merge_update(pending: list[dict], operator: str, path: str, value: typing.Any):
+    """
+    Coalesces a single-path operation into a list of pending update documents.
+    $set/$unset replace any earlier write to the same path, while array operators
+    on the same path are merged into one $each/$in list. If the path clashes with
+    a different path (or operator) of the last document, e.g. "A" and "A.b", a new
+    document is started, since Mongo refuses conflicting paths inside one update.
+    """
+    last = pending[-1] if pending else None
+    if last is not None:
+        if operator in ARRAY_MODIFIERS and path in last.get(operator, {}):
+            modifier = ARRAY_MODIFIERS[operator]
+            merged = last[operator][path][modifier]
+            merged.extend(item for item in value[modifier] if item not in merged)
+            return
+
+        if operator not in ARRAY_MODIFIERS:
+            for fields in last.values():
+                fields.pop(path, None)
+            for op in [op for op, fields in last.items() if not fields]:
+                del last[op]
+
+        clash = any(
+            _paths_conflict(path, other) for fields in last.values() for other in fields
+        )
+        if not clash:
+            last.setdefault(operator, {})[path] = value
+            return
+    pending.append({operator: {path: value}})
 
 
 class GuildDataManager:
-    def __init__(self, collection: Collection, module_name: str):
-        self.db = collection
+    """
+    Per-module guild configuration, cached in memory and persisted on a storage
+    backend (one document per guild, identified by GUILD_ID): Mongo, SQLite or
+    in-memory, see GuildDataBackend.create_backend. A bare motor collection is
+    accepted too and wrapped in a MongoBackend.
+    Every method that may touch the database is a coroutine.
+    Call `await load()` once (usually from the cog's `cog_load`) to warm the cache,
+    and `await close()` on `cog_unload` so pending writes are flushed.
+
+    Cache policy: `preload` (env GDM_PRELOAD) is "all" to read the whole collection
+    on load (default), "guilds" to only read the guild ids given to `load`/`prefetch`
+    or "none" to load each guild on first access. The cache is an LRU bounded by
+    `max_guilds` (env GDM_CACHE_MAX_GUILDS) and guilds untouched for `idle_ttl`
+    seconds (env GDM_CACHE_IDLE_TTL) are evicted; 0 disables either bound.
+    Only whole guild documents are cached, evicted guilds are read again on demand.
+    Guilds without a document are remembered (until written to) so absent keys never
+    hit the database, and concurrent misses are batched into one $in query per tick.
+
+    Write-behind mode (`write_behind=True` or env GDM_WRITE_BEHIND=true): `set` and
+    `delete` only update the cache and queue the change; repeated writes to the same
+    guild/key are coalesced and flushed as a single `bulk_write` at most
+    `flush_interval` seconds later (env GDM_FLUSH_INTERVAL, default 5).
+    Use `durable=True` or `await flush()` when a write must hit the database now.
+
+    Watch mode (`watch=True` or env GDM_WATCH=true): a change stream on the
+    collection patches or evicts cached guilds whenever their document is changed
+    by another process (another replica, a manual edit...). Servers without change
+    stream support fall back to re-reading the cached guilds every `poll_interval`
+    seconds (env GDM_POLL_INTERVAL, default 30).
+
+    Warm start (`snapshot_dir` or env GDM_SNAPSHOT_VOLUME): the cache is saved to
+    `<dir>/gdm-<module>.snapshot` every `snapshot_interval` seconds (env
+    GDM_SNAPSHOT_INTERVAL, default 300) and on close. On load a valid snapshot is
+    served right away while the cache is reconciled with the database in the
+    background, retrying until the database answers.
+    """
+
+    def __init__(
+        self,
+        storage: backends.GuildDataBackend,
+        module_name: str,
+        write_behind: typing.Optional[bool] = None,
+        flush_interval: typing.Optional[float] = None,
+        watch: typing.Optional[bool] = None,
+        poll_interval: typing.Optional[float] = None,
+        preload: typing.Optional[str] = None,
+        max_guilds: typing.Optional[int] = None,
+        idle_ttl: typing.Optional[float] = None,
+        snapshot_dir: typing.Optional[str] = None,
+        snapshot_interval: typing.Optional[float] = None,
+    ):
+        if not isinstance(storage, backends.GuildDataBackend):
+            storage = backends.MongoBackend(storage)
+        self.backend = storage
         self.module_name = module_name
         self.logger = logging.getLogger(f"bot.module.{module_name}.GuildDataManager")
-        self.cache = {}
+        self.cache = OrderedDict()  # guild_id: document, least recently used first
+
+        if preload is None:
+            preload = os.getenv("GDM_PRELOAD", "all").lower()
+        if preload not in PRELOAD_MODES:
+            raise ValueError(f"Invalid GDM preload mode: {preload}")
+        if max_guilds is None:
+            max_guilds = int(os.getenv("GDM_CACHE_MAX_GUILDS", "0"))
+        if idle_ttl is None:
+            idle_ttl = float(os.getenv("GDM_CACHE_IDLE_TTL", "0"))
+        self.preload = preload
+        self.max_guilds = max_guilds
+        self.idle_ttl = idle_ttl
+        self._last_access = {}  # guild_id: time.monotonic() of the last access
+        self._sweep_task = None
 
+        # miss handling
+        self._complete = False  # whole collection cached and nothing evicted since
+        self._absent = OrderedDict()  # guild ids known to have no document
+        self._loading = {}  # guild_id: future of the document being read
+        self._load_queue = []  # guild ids waiting for the next batched read
+        self._load_task = None
+        self._raced = {}  # guild_id: updates made while its document was being read
+
+        if write_behind is None:
+            write_behind = os.getenv("GDM_WRITE_BEHIND", "false").lower() == "true"
+        if flush_interval is None:
+            flush_interval = float(os.getenv("GDM_FLUSH_INTERVAL", "5"))
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self._pending = {}  # guild_id: [update documents, in order]
+        self._inflight = {}  # batch currently being written by flush()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+
+        if watch is None:
+            watch = os.getenv("GDM_WATCH", "false").lower() == "true"
+        if poll_interval is None:
+            poll_interval = float(os.getenv("GDM_POLL_INTERVAL", "30"))
+        self.watch = watch
+        self.poll_interval = poll_interval
+        self._ids = {}  # document _id: guild_id, to resolve delete events
+        self._watch_task = None
+
+        if snapshot_dir is None:
+            snapshot_dir = os.getenv("GDM_SNAPSHOT_VOLUME")
+        if snapshot_interval is None:
+            snapshot_interval = float(os.getenv("GDM_SNAPSHOT_INTERVAL", "300"))
+        self.snapshot_path = (
+            os.path.join(snapshot_dir, f"gdm-{module_name}.snapshot")
+            if snapshot_dir
+            else None
+        )
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_task = None
+        self._reconcile_task = None
+
+    async def load(self, guild_ids: typing.Iterable[int] = ()):
+        """Warms the cache according to `preload` and starts the background tasks."""
+        guild_ids = list(guild_ids)
+        if await self._restore_snapshot():
+            self._reconcile_task = asyncio.create_task(self._reconcile(guild_ids))
+        else:
+            try:
+                await self._preload(guild_ids)
+            except errors.ServerSelectionTimeoutError:
+                self.logger.error("Failed to connect to database.")
+
+        if self.write_behind and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self.watch and not self._watch_task:
+            self._watch_task = asyncio.create_task(self._watch_loop())
+        if self.idle_ttl and not self._sweep_task:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+        if self.snapshot_path and not self._snapshot_task:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def close(self):
+        """Stops the background tasks and writes whatever is still pending."""
+        tasks = (
+            self._flush_task,
+            self._watch_task,
+            self._sweep_task,
+            self._snapshot_task,
+            self._reconcile_task,
+        )
+        tasks = [task for task in tasks if task]
+        for task in tasks:
+            task.cancel()
+        # a flush cancelled midway requeues its batch, so wait for that first
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._flush_task = self._watch_task = self._sweep_task = None
+        self._snapshot_task = self._reconcile_task = None
         try:
-            self._load_all()
-        except ServerSelectionTimeoutError:
-            self.logger.error("Failed to connect to database.")
+            await self.flush()
+        except Exception as e:
+            if not isinstance(e, backends.STORAGE_ERRORS):  # those flush() logged
+                self.logger.exception("Unexpected error flushing pending writes.")
+            self.logger.error(
+                f"Closing with unsaved changes for {len(self._pending)} guilds."
+            )
+        if self.snapshot_path:
+            await self.save_snapshot()
+        await self.backend.close()
 
-    def _load_all(self):
+    async def _preload(self, guild_ids: list[int]):
+        if self.preload == "all":
+            await self._load_all()
+        elif self.preload == "guilds":
+            await self.prefetch(guild_ids)
+
+    async def _load_all(self):
         """Loads all guild configs from the database."""
-        result = self.db.find({})
-        for doc in result:
+        found = set()
+        async for doc in self.backend.load_all():
             gid = doc.get("GUILD_ID")
             if gid:
-                self.cache[gid] = doc
+                found.add(gid)
+                self._store(gid, doc)
+        # cached guilds (e.g. restored from a snapshot) deleted in the meantime
+        for gid in [gid for gid in self.cache if gid not in found]:
+            self._store(gid, {}, touch=False)
+        self._complete = not self.max_guilds and not self.idle_ttl
         self.logger.trace(f"Loaded {len(self.cache)} guilds into cache.")
 
-    def get(self, guild_id: int, key: str, fallback: typing.Any = None):
+    async def prefetch(self, guild_ids: typing.Iterable[int]):
+        """Loads the given guilds that are not cached yet, in a few $in queries."""
+        missing = [gid for gid in dict.fromkeys(guild_ids) if gid not in self.cache]
+        await asyncio.gather(*(self._load(gid) for gid in missing))
+        if missing:
+            self.logger.trace(f"Prefetched {len(missing)} guilds into cache.")
+
+    async def get(self, guild_id: int, key: str, fallback: typing.Any = None):
         """Get a value for a specific guild and key."""
-        if guild_id not in self.cache:
-            self.cache[guild_id] = {}
+        data = await self.for_guild(guild_id)
+        return data.get(key, fallback)
+
+    async def set(
+        self, guild_id: int, key: str, value: typing.Any, durable: bool = False
+    ):
+        await self._update(guild_id, "$set", key, value, durable)
+
+    async def delete(self, guild_id: int, key: str, durable: bool = False):
+        await self._update(guild_id, "$unset", key, "", durable)
+
+    # field-level operations, O(1) writes on nested maps and set-like arrays
 
-        if key in self.cache[guild_id]:
-            return self.cache[guild_id][key]
+    async def set_path(
+        self, guild_id: int, path: str, value: typing.Any, durable: bool = False
+    ):
+        """Sets a nested value, e.g. set_path(gid, "THREAD_SESSIONS.123", {...})."""
+        await self._update(guild_id, "$set", path, value, durable)
 
-        result = self.db.find_one({"GUILD_ID": guild_id}, {key: 1, "_id": 0})
-        if not result or key not in result:
-            return fallback
+    async def unset_path(self, guild_id: int, path: str, durable: bool = False):
+        """Removes a nested value, e.g. unset_path(gid, "TEMP_CHANNEL_ALIASES.42")."""
+        await self._update(guild_id, "$unset", path, "", durable)
 
-        self.cache[guild_id][key] = result[key]
-        return result[key]
+    async def add_to_set(
+        self, guild_id: int, key: str, *values: typing.Any, durable: bool = False
+    ):
+        """Adds values to an array (if not there already), creating it if needed."""
+        await self._update(guild_id, "$addToSet", key, {"$each": list(values)}, durable)
 
-    def set(self, guild_id: int, key: str, value: typing.Any):
-        self.db.update_one({"GUILD_ID": guild_id}, {"$set": {key: value}}, upsert=True)
-        self.cache.setdefault(guild_id, {})[key] = value
+    async def pull(
+        self, guild_id: int, key: str, *values: typing.Any, durable: bool = False
+    ):
+        """Removes every occurrence of the given values from an array."""
+        await self._update(guild_id, "$pull", key, {"$in": list(values)}, durable)
 
-    def delete(self, guild_id: int, key: str):
-        self.db.update_one({"GUILD_ID": guild_id}, {"$unset": {key: ""}}, upsert=True)
-        self.cache.setdefault(guild_id, {}).pop(key, None)
+    async def _update(
+        self,
+        guild_id: int,
+        operator: str,
+        path: str,
+        value: typing.Any,
+        durable: bool = False,
+    ):
+        update = {operator: {path: value}}
+        if not self.write_behind:
+            # database first: a write that fails must not show up in the cache
+            await self.backend.apply([(guild_id, update)])
+
+        # guilds that are not cached get the change when they are read again
+        if guild_id not in self.cache and (self._complete or guild_id in self._absent):
+            self._store(guild_id, {})  # known to have no document yet
+        if guild_id in self.cache:
+            backends.apply_update(self.cache[guild_id], update)
+            self._touch(guild_id)
+        elif guild_id in self._loading:
+            # the read may predate this write, replayed on top of it (idempotent)
+            self._raced.setdefault(guild_id, []).append(update)
+        self._absent.pop(guild_id, None)
+        if self.write_behind:
+            await self._queue_write(guild_id, operator, path, value, durable)
 
     def replace_cache(self, guild_id: int, data: dict):
         """Overwrite the entire cache entry for a guild (used in update_cache)."""
         self.cache[guild_id] = data
+        self._touch(guild_id)
+        self._evict()
 
     def get_cache(self, guild_id: int) -> dict:
-        return self.cache.get(guild_id, {})
+        if guild_id not in self.cache:
+            return {}
+        self._touch(guild_id)
+        return self.cache[guild_id]
 
     # official methods
 
-    def refresh_cache_from_db(self, guild_id: int):
-        data = self.db.find_one({"GUILD_ID": guild_id})
-        self.cache[guild_id] = data or {}
+    async def refresh_cache_from_db(self, guild_id: int):
+        self._absent.pop(guild_id, None)
+        await self._load(guild_id)
 
-    def for_guild(self, guild_id: int) -> dict:
-        if guild_id not in self.cache:
-            self.refresh_cache_from_db(guild_id)
-        return self.cache[guild_id]
+    async def for_guild(self, guild_id: int) -> dict:
+        if guild_id in self.cache:
+            self._touch(guild_id)
+            return self.cache[guild_id]
+        if self._complete or guild_id in self._absent:
+            self._store(guild_id, {})
+            return self.cache[guild_id]
+        return await self._load(guild_id)
+
+    # batched reads
+
+    async def _load(self, guild_id: int) -> dict:
+        """Reads a guild document; concurrent reads share one $in query per tick."""
+        future = self._loading.get(guild_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._loading[guild_id] = future
+            self._load_queue.append(guild_id)
+            if not self._load_task:
+                self._load_task = asyncio.create_task(self._dispatch_loads())
+        return await asyncio.shield(future)
+
+    async def _dispatch_loads(self):
+        queue, self._load_queue = self._load_queue, []
+        self._load_task = None
+        docs = {}
+        try:
+            for i in range(0, len(queue), IN_QUERY_CHUNK):
+                docs.update(await self.backend.load_many(queue[i : i + IN_QUERY_CHUNK]))
+        except Exception as e:
+            for gid in queue:
+                self._raced.pop(gid, None)
+                future = self._loading.pop(gid)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.logger.trace(f"Read {len(queue)} guilds in one batch.")
+        for gid in queue:
+            doc = docs.get(gid)
+            if doc is None:
+                self._remember_absent(gid)
+            doc = doc or {}
+            for update in self._raced.pop(gid, []):
+                backends.apply_update(doc, update)
+            self._store(gid, doc)
+            future = self._loading.pop(gid)
+            if not future.done():
+                future.set_result(doc)
+
+    def _remember_absent(self, guild_id: int):
+        self._absent[guild_id] = None
+        self._absent.move_to_end(guild_id)
+        if len(self._absent) > NEGATIVE_CACHE_SIZE:
+            self._absent.popitem(last=False)
+
+    def _store(self, guild_id: int, doc: dict, touch: bool = True):
+        """
+        Caches a document read from the database, with unflushed writes on top.
+        Background refreshes pass touch=False so they don't keep idle guilds alive.
+        """
+        if "_id" in doc:
+            self._ids[doc["_id"]] = guild_id
+        if "GUILD_ID" in doc:
+            # found by a poll, reload or prefetch: no longer known to be absent
+            self._absent.pop(guild_id, None)
+        for pending in (self._inflight, self._pending):
+            for update in pending.get(guild_id, []):
+                backends.apply_update(doc, update)
+        self.cache[guild_id] = doc
+        if touch:
+            self._touch(guild_id)
+            self._evict(keep=guild_id)
+
+    # LRU bookkeeping
+
+    def _touch(self, guild_id: int):
+        self.cache.move_to_end(guild_id)
+        self._last_access[guild_id] = time.monotonic()
+
+    def _evict(self, keep: typing.Optional[int] = None):
+        """Drops least recently used guilds until the cache fits in max_guilds."""
+        while self.max_guilds and len(self.cache) > self.max_guilds:
+            guild_id = next(iter(self.cache))
+            if guild_id == keep:
+                break
+            self._forget(guild_id)
+
+    def _forget(self, guild_id: int):
+        self._complete = False
+        doc = self.cache.pop(guild_id, None) or {}
+        self._last_access.pop(guild_id, None)
+        self._ids.pop(doc.get("_id"), None)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(max(self.idle_ttl / 2, 1))
+            deadline = time.monotonic() - self.idle_ttl
+            # least recently used first, so stop at the first guild still active
+            for guild_id in list(self.cache):
+                if self._last_access.get(guild_id, 0) > deadline:
+                    break
+                self._forget(guild_id)
+
+    # write-behind
+
+    async def _queue_write(
+        self,
+        guild_id: int,
+        operator: str,
+        path: str,
+        value: typing.Any,
+        durable: bool = False,
+    ):
+        _merge_update(self._pending.setdefault(guild_id, []), operator, path, value)
+        if durable:
+            await self.flush()
+
+    async def flush(self):
+        """Writes every pending change to the database in one ordered batch."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+            operations = [
+                (guild_id, update)
+                for guild_id, updates in batch.items()
+                for update in updates
+            ]
+            try:
+                await self.backend.apply(operations)
+                self.logger.trace(
+                    f"Flushed {len(operations)} updates for {len(batch)} guilds."
+                )
+            except BaseException as e:
+                # every queued operator is idempotent, so the whole batch is
+                # requeued ahead of anything written in the meantime (also when
+                # cancelled, e.g. by close(), which flushes it again)
+                if isinstance(e, backends.STORAGE_ERRORS):
+                    self.logger.error(f"Failed to flush pending writes: {e}")
+                for guild_id, updates in batch.items():
+                    self._pending[guild_id] = updates + self._pending.get(guild_id, [])
+                raise
+            finally:
+                self._inflight = {}
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except backends.STORAGE_ERRORS:
+                pass  # already logged, retried on the next tick
+            except Exception:
+                self.logger.exception("Unexpected error flushing pending writes.")
+
+    # cross-process invalidation
+
+    async def _watch_loop(self):
+        if not self.backend.supports_watch:
+            self.logger.warning(
+                f"{type(self.backend).__name__} cannot be watched, "
+                f"polling every {self.poll_interval}s instead."
+            )
+            await self._poll_loop()
+            return
+
+        resume_token = None
+        while True:
+            try:
+                async with self.backend.watch(resume_after=resume_token) as stream:
+                    self.logger.debug("Watching collection for external changes.")
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._apply_change(change)
+            except errors.OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    self.logger.warning(
+                        "Change streams not supported by the server, "
+                        f"polling every {self.poll_interval}s instead."
+                    )
+                    await self._poll_loop()
+                    return
+                self.logger.error(f"Change stream failed: {e}")
+                resume_token = None
+            except errors.PyMongoError as e:
+                self.logger.error(f"Change stream interrupted: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def _apply_change(self, change: dict):
+        operation = change.get("operationType")
+        doc = change.get("fullDocument")
+
+        if operation in ("insert", "update", "replace") and doc:
+            gid = doc.get("GUILD_ID")
+            self._absent.pop(gid, None)
+            if gid in self.cache or self._complete:
+                self._store(gid, doc, touch=False)
+                self.logger.trace(f"Guild {gid} patched from change stream.")
+        elif operation in ("update", "delete"):
+            # update without fullDocument means it was deleted right after
+            gid = self._ids.pop(change.get("documentKey", {}).get("_id"), None)
+            if gid in self.cache:
+                self._store(gid, {}, touch=False)
+                self.logger.trace(f"Guild {gid} evicted from change stream.")
+        elif operation in ("drop", "dropDatabase", "invalidate"):
+            self.logger.warning(f"Collection {operation}, clearing cache.")
+            self.cache.clear()
+            self._last_access.clear()
+            self._ids.clear()
+            self._absent.clear()
+            self._complete = False
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._poll_once()
+            except backends.STORAGE_ERRORS as e:
+                self.logger.error(f"Failed to poll guild configs: {e}")
+
+    async def _poll_once(self):
+        guild_ids = list(self.cache)
+        if not guild_ids:
+            return
+        found = set()
+        docs = {}
+        for i in range(0, len(guild_ids), IN_QUERY_CHUNK):
+            docs.update(await self.backend.load_many(guild_ids[i : i + IN_QUERY_CHUNK]))
+        for gid, doc in docs.items():
+            if gid in self.cache:
+                found.add(gid)
+                self._store(gid, doc, touch=False)
+        for gid in guild_ids:
+            if gid not in found and gid in self.cache:
+                self._store(gid, {}, touch=False)
+
+    # warm start
+
+    async def save_snapshot(self):
+        """Writes the current cache to the snapshot file."""
+        data = {
+            "module": self.module_name,
+            "cache": dict(self.cache),
+        }
+        try:
+            # pickled here for a consistent view, compressed and written off the loop
+            frozen = freeze(data)
+            await asyncio.to_thread(write_snapshot, self.snapshot_path, frozen)
+            self.logger.trace(f"Saved {len(data['cache'])} guilds to snapshot.")
+        except Exception as e:
+            self.logger.error(f"Failed to save snapshot: {e}")
+
+    async def _restore_snapshot(self) -> bool:
+        if not self.snapshot_path:
+            return False
+        data = await asyncio.to_thread(read_snapshot, self.snapshot_path)
+        if not data or data.get("module") != self.module_name:
+            return False
+
+        # guilds known to be absent are not restored: one may have been configured
+        # while the bot was down, and nothing would read it again before a write
+        for gid, doc in data["cache"].items():
+            self._store(gid, doc)
+        self.logger.info(f"Restored {len(data['cache'])} guilds from snapshot.")
+        return True
+
+    async def _reconcile(self, guild_ids: list[int]):
+        """Brings a cache restored from a snapshot up to date with the database."""
+        while True:
+            try:
+                if self.preload != "all":
+                    await self._poll_once()
+                await self._preload(guild_ids)
+                self.logger.debug("Cache reconciled with the database.")
+                return
+            except backends.STORAGE_ERRORS as e:
+                self.logger.error(f"Failed to reconcile cache, retrying: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.save_snapshot()
@@ -0,0 +1,62 @@
+import typing
+from collections import Counter
+
+import discord
+
+MONITORED_MESSAGE = "monitored_message"
+BOT_MENTION = "bot_mention"
+
+
+class MessageRouter:
+    """
+    Pre-filters the bot's incoming messages so modules only see the ones meant for
+    them, instead of every cog running on_message for every message of every guild.
+
+    A message in a monitored thread is dispatched as `on_monitored_message`, one that
+    starts by mentioning the bot as `on_bot_mention`; anything else (including other
+    bots' messages and DMs) is dropped. Modules register the set of thread ids they
+    monitor with monitor() and keep it up to date themselves, lookups are O(1).
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.monitored: list[typing.Collection[int]] = []
+        self._mentions: typing.Optional[tuple[str, ...]] = None
+        self.counters = Counter()
+
+    def monitor(self, thread_ids: typing.Collection[int]):
+        """Routes messages sent in the given threads (a live set, not a copy)."""
+        self.monitored.append(thread_ids)
+
+    def unmonitor(self, thread_ids: typing.Collection[int]):
+        self.monitored = [ids for ids in self.monitored if ids is not thread_ids]
+
+    def mentions(self) -> tuple[str, ...]:
+        """The prefixes a message mentioning the bot starts with."""
+        if self._mentions is None:
+            user_id = self.bot.user.id
+            self._mentions = (f"<@{user_id}>", f"<@!{user_id}>")
+        return self._mentions
+
+    def route(self, message: discord.Message) -> typing.Optional[str]:
+        """The event to dispatch for the message, or None if no module wants it."""
+        if message.author.bot or message.guild is None:
+            return None
+
+        channel_id = message.channel.id
+        if any(channel_id in ids for ids in self.monitored):
+            return MONITORED_MESSAGE
+        if isinstance(message.channel, discord.Thread):
+            return None
+        if message.content.lstrip().startswith(self.mentions()):
+            return BOT_MENTION
+        return None
+
+    def dispatch(self, message: discord.Message):
+        event = self.route(message)
+        self.counters[event or "dropped"] += 1
+        if event:
+            self.bot.dispatch(event, message)
+
+    def stats(self) -> dict:
+        return dict(self.counters)
@@ -0,0 +1,384 @@
+import abc
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import typing
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne, errors
+
+from src.bot.core.GuildDataBackend import BACKENDS
+from src.bot.utils.database import AsyncDatabaseClient
+
+# raised by create_index when an index exists with other options (e.g. another TTL)
+INDEX_OPTIONS_CONFLICT = 85
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SessionBackend(abc.ABC):
+    """
+    Storage behind a SessionStore: one session per thread,
+    {"thread_id", "guild_id", "session_id", "last_active"} (naive UTC datetime).
+    Sessions untouched for `retention` are removed by the storage itself (Mongo TTL
+    index) or by purge().
+    """
+
+    @abc.abstractmethod
+    async def setup(self, retention: timedelta):
+        """Prepares the storage (indexes, tables) to keep sessions for `retention`."""
+
+    @abc.abstractmethod
+    async def get(self, thread_id: int) -> typing.Optional[dict]:
+        """The thread's session, or None."""
+
+    @abc.abstractmethod
+    async def get_many(self, thread_ids: list[int]) -> dict[int, dict]:
+        """Returns {thread_id: session} for the given threads that have one."""
+
+    @abc.abstractmethod
+    async def save(self, session: dict):
+        """Creates or replaces session["thread_id"]'s session."""
+
+    @abc.abstractmethod
+    async def touch_many(self, last_active: dict[int, datetime]):
+        """
+        Moves the last_active of existing sessions forward ({thread_id: when}), never
+        back, and without recreating deleted sessions.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, thread_id: int) -> bool:
+        """Deletes the thread's session, returns whether it had one."""
+
+    @abc.abstractmethod
+    async def delete_guild(self, guild_id: int) -> list[int]:
+        """Deletes every session of the guild, returns their thread ids."""
+
+    @abc.abstractmethod
+    async def list_guild(self, guild_id: int, since: datetime) -> list[dict]:
+        """Sessions of the guild active after `since`, most recent first."""
+
+    @abc.abstractmethod
+    def load_all(self) -> typing.AsyncIterator[dict]:
+        """Yields {"thread_id", "last_active"} of every stored session."""
+
+    async def purge(self, before: datetime):
+        """Removes the sessions inactive since before `before` (past retention)."""
+
+    async def close(self):
+        pass
+
+
+class MongoSessions(SessionBackend):
+    """A motor collection, one document per thread; retention is a TTL index."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def setup(self, retention: timedelta):
+        await self.collection.create_index("thread_id", unique=True)
+        await self.collection.create_index([("guild_id", 1), ("last_active", -1)])
+
+        ttl = int(retention.total_seconds())
+        try:
+            await self.collection.create_index("last_active", expireAfterSeconds=ttl)
+        except errors.OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # retention changed since the index was created
+            await self.collection.database.command(
+                "collMod",
+                self.collection.name,
+                index={"keyPattern": {"last_active": 1}, "expireAfterSeconds": ttl},
+            )
+
+    async def get(self, thread_id: int) -> typing.Optional[dict]:
+        return await self.collection.find_one({"thread_id": thread_id}, {"_id": 0})
+
+    async def get_many(self, thread_ids: list[int]) -> dict[int, dict]:
+        sessions = {}
+        cursor = self.collection.find({"thread_id": {"$in": thread_ids}}, {"_id": 0})
+        async for session in cursor:
+            sessions[session["thread_id"]] = session
+        return sessions
+
+    async def save(self, session: dict):
+        await self.collection.update_one(
+            {"thread_id": session["thread_id"]}, {"$set": session}, upsert=True
+        )
+
+    async def touch_many(self, last_active: dict[int, datetime]):
+        # $max: a late batch never moves a session back in time, and without
+        # upsert a session deleted in the meantime is not recreated
+        await self.collection.bulk_write(
+            [
+                UpdateOne({"thread_id": thread_id}, {"$max": {"last_active": when}})
+                for thread_id, when in last_active.items()
+            ],
+            ordered=False,
+        )
+
+    async def delete(self, thread_id: int) -> bool:
+        result = await self.collection.delete_one({"thread_id": thread_id})
+        return result.deleted_count > 0
+
+    async def delete_guild(self, guild_id: int) -> list[int]:
+        thread_ids = await self.collection.distinct("thread_id", {"guild_id": guild_id})
+        await self.collection.delete_many({"guild_id": guild_id})
+        return thread_ids
+
+    async def list_guild(self, guild_id: int, since: datetime) -> list[dict]:
+        cursor = self.collection.find(
+            {"guild_id": guild_id, "last_active": {"$gt": since}}, {"_id": 0}
+        ).sort("last_active", -1)
+        return await cursor.to_list(length=None)
+
+    async def load_all(self):
+        cursor = self.collection.find({}, {"_id": 0, "thread_id": 1, "last_active": 1})
+        async for doc in cursor:
+            yield doc
+
+
+class MemorySessions(SessionBackend):
+    """
+    Process-local storage, for tests and throwaway deployments.
+    Stores are shared by name so a reloaded module finds its sessions again.
+    """
+
+    _stores = {}  # name: {thread_id: session}
+
+    def __init__(self, name: str):
+        self.sessions = MemorySessions._stores.setdefault(name, {})
+
+    async def setup(self, retention: timedelta):
+        pass
+
+    async def get(self, thread_id: int) -> typing.Optional[dict]:
+        session = self.sessions.get(thread_id)
+        return dict(session) if session else None
+
+    async def get_many(self, thread_ids: list[int]) -> dict[int, dict]:
+        return {
+            thread_id: dict(self.sessions[thread_id])
+            for thread_id in thread_ids
+            if thread_id in self.sessions
+        }
+
+    async def save(self, session: dict):
+        self.sessions[session["thread_id"]] = dict(session)
+
+    async def touch_many(self, last_active: dict[int, datetime]):
+        for thread_id, when in last_active.items():
+            session = self.sessions.get(thread_id)
+            if session is not None:
+                session["last_active"] = max(session["last_active"], when)
+
+    async def delete(self, thread_id: int) -> bool:
+        return self.sessions.pop(thread_id, None) is not None
+
+    async def delete_guild(self, guild_id: int) -> list[int]:
+        thread_ids = [
+            thread_id
+            for thread_id, session in self.sessions.items()
+            if session["guild_id"] == guild_id
+        ]
+        for thread_id in thread_ids:
+            del self.sessions[thread_id]
+        return thread_ids
+
+    async def list_guild(self, guild_id: int, since: datetime) -> list[dict]:
+        sessions = [
+            dict(session)
+            for session in self.sessions.values()
+            if session["guild_id"] == guild_id and session["last_active"] > since
+        ]
+        return sorted(sessions, key=lambda s: s["last_active"], reverse=True)
+
+    async def load_all(self):
+        for session in list(self.sessions.values()):
+            yield {
+                "thread_id": session["thread_id"],
+                "last_active": session["last_active"],
+            }
+
+    async def purge(self, before: datetime):
+        for thread_id, session in list(self.sessions.items()):
+            if session["last_active"] < before:
+                del self.sessions[thread_id]
+
+
+def _to_epoch(when: datetime) -> float:
+    return (when - EPOCH).total_seconds()
+
+
+def _from_epoch(seconds: float) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class SQLiteSessions(SessionBackend):
+    """
+    Sessions in a table of a SQLite file (the GDM's, in WAL mode), last_active as
+    UTC epoch seconds. Queries run in a worker thread to keep the loop free.
+    """
+
+    COLUMNS = "thread_id, guild_id, session_id, last_active"
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                collection TEXT NOT NULL,
+                thread_id INTEGER NOT NULL,
+                guild_id INTEGER,
+                session_id TEXT NOT NULL,
+                last_active REAL NOT NULL,
+                PRIMARY KEY (collection, thread_id)
+            ) WITHOUT ROWID
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS chat_sessions_guild "
+            "ON chat_sessions (collection, guild_id, last_active)"
+        )
+
+    @staticmethod
+    def _to_session(row) -> dict:
+        thread_id, guild_id, session_id, last_active = row
+        return {
+            "thread_id": thread_id,
+            "guild_id": guild_id,
+            "session_id": session_id,
+            "last_active": _from_epoch(last_active),
+        }
+
+    def _run(self, sql: str, params=(), many: bool = False) -> sqlite3.Cursor:
+        with self._lock:
+            if many:
+                return self._conn.executemany(sql, params)
+            return self._conn.execute(sql, params)
+
+    def _fetch(self, sql: str, params=()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def setup(self, retention: timedelta):
+        pass
+
+    async def get(self, thread_id: int) -> typing.Optional[dict]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            f"SELECT {self.COLUMNS} FROM chat_sessions "
+            "WHERE collection = ? AND thread_id = ?",
+            (self.name, thread_id),
+        )
+        return self._to_session(rows[0]) if rows else None
+
+    async def get_many(self, thread_ids: list[int]) -> dict[int, dict]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            f"SELECT {self.COLUMNS} FROM chat_sessions WHERE collection = ? "
+            "AND thread_id IN (SELECT value FROM json_each(?))",
+            (self.name, json.dumps(thread_ids)),
+        )
+        return {row[0]: self._to_session(row) for row in rows}
+
+    async def save(self, session: dict):
+        await asyncio.to_thread(
+            self._run,
+            f"INSERT OR REPLACE INTO chat_sessions (collection, {self.COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                self.name,
+                session["thread_id"],
+                session["guild_id"],
+                session["session_id"],
+                _to_epoch(session["last_active"]),
+            ),
+        )
+
+    async def touch_many(self, last_active: dict[int, datetime]):
+        await asyncio.to_thread(
+            self._run,
+            "UPDATE chat_sessions SET last_active = max(last_active, ?) "
+            "WHERE collection = ? AND thread_id = ?",
+            [
+                (_to_epoch(when), self.name, thread_id)
+                for thread_id, when in last_active.items()
+            ],
+            True,
+        )
+
+    async def delete(self, thread_id: int) -> bool:
+        cursor = await asyncio.to_thread(
+            self._run,
+            "DELETE FROM chat_sessions WHERE collection = ? AND thread_id = ?",
+            (self.name, thread_id),
+        )
+        return cursor.rowcount > 0
+
+    async def delete_guild(self, guild_id: int) -> list[int]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "DELETE FROM chat_sessions WHERE collection = ? AND guild_id = ? "
+            "RETURNING thread_id",
+            (self.name, guild_id),
+        )
+        return [thread_id for (thread_id,) in rows]
+
+    async def list_guild(self, guild_id: int, since: datetime) -> list[dict]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            f"SELECT {self.COLUMNS} FROM chat_sessions "
+            "WHERE collection = ? AND guild_id = ? AND last_active > ? "
+            "ORDER BY last_active DESC",
+            (self.name, guild_id, _to_epoch(since)),
+        )
+        return [self._to_session(row) for row in rows]
+
+    async def load_all(self):
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT thread_id, last_active FROM chat_sessions WHERE collection = ?",
+            (self.name,),
+        )
+        for thread_id, last_active in rows:
+            yield {"thread_id": thread_id, "last_active": _from_epoch(last_active)}
+
+    async def purge(self, before: datetime):
+        await asyncio.to_thread(
+            self._run,
+            "DELETE FROM chat_sessions WHERE collection = ? AND last_active < ?",
+            (self.name, _to_epoch(before)),
+        )
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_backend(
+    name: str, kind: typing.Optional[str] = None
+) -> SessionBackend:
+    """
+    Builds the session storage for the collection `name` on the same backend as the
+    guild data (env GDM_BACKEND: mongo, memory or sqlite, at GDM_SQLITE_PATH).
+    """
+    if kind is None:
+        kind = os.getenv("GDM_BACKEND", "mongo").lower()
+
+    if kind == "mongo":
+        return MongoSessions(AsyncDatabaseClient().get_collection(name))
+    if kind == "memory":
+        return MemorySessions(name)
+    if kind == "sqlite":
+        return SQLiteSessions(os.getenv("GDM_SQLITE_PATH", "voxbot.sqlite3"), name)
+    raise ValueError(f"Invalid session backend: {kind} (expected one of {BACKENDS})")
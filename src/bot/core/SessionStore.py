@@ -0,0 +1,285 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import typing
+from datetime import datetime, timedelta
+
+from src.bot.core.GuildDataBackend import STORAGE_ERRORS
+from src.bot.core.SessionBackend import SessionBackend
+from src.bot.utils.cache import Cache
+
+
+class SessionStore:
+    """
+    Chatbot sessions of a module, one per thread in a SessionBackend (Mongo, SQLite
+    or memory): {"thread_id", "guild_id", "session_id", "last_active"} (naive UTC
+    datetime).
+
+    Sessions untouched for `timeout` are expired for the bot; the storage deletes
+    them `retention` after their last activity (Mongo TTL index, or purged by
+    load_deadlines), which leaves the bot time to clean up their threads first. Reads go through a bounded
+    LRU of recently used sessions, threads without a session are remembered briefly
+    too, so routing a message usually costs no query.
+
+    touch() only updates last_active in memory; the new timestamps are written in a
+    single batch every `flush_interval` seconds, so an active thread costs at
+    most one write per interval instead of one per message.
+    `thread_ids` holds every thread known to have a session (filled by
+    load_deadlines), for cheap "is this thread monitored" checks.
+
+    Expiry deadlines (last_active + timeout) are kept in a heap: next_expired() sleeps
+    until the earliest one and returns the sessions that really timed out, touched
+    ones are just rescheduled. load_deadlines() schedules every stored session.
+
+    Call `await setup()` once to prepare the storage, and `await close()` on
+    `cog_unload` so pending timestamps are flushed.
+    """
+
+    def __init__(
+        self,
+        storage: SessionBackend,
+        module_name: str,
+        timeout: timedelta,
+        retention: timedelta,
+        max_cached: int = 1000,
+        flush_interval: float = 30,
+    ):
+        self.storage = storage
+        self.timeout = timeout
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(f"bot.module.{module_name}.SessionStore")
+        self.cache = Cache(max_entries=max_cached)  # thread_id: session
+        self.absent = Cache(ttl=300, max_entries=max_cached)  # thread_id: True
+        self.thread_ids: set[int] = set()
+        self._dirty = {}  # thread_id: last_active not written yet
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        self._deadlines = []  # heap of (expires_at, thread_id)
+        self._scheduled = {}  # thread_id: expires_at of its current heap entry
+        self._wakeup = asyncio.Event()
+
+    async def setup(self):
+        await self.storage.setup(self.retention)
+        self.logger.debug("Session storage ready.")
+
+    async def close(self):
+        """Stops the flush loop and writes the pending timestamps."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            # a flush cut short puts its batch back, the one below writes it
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        try:
+            await self.flush()
+        except STORAGE_ERRORS:
+            self.logger.error(f"Closing with {len(self._dirty)} unsaved timestamps.")
+        except Exception:
+            self.logger.exception("Unexpected error flushing session activity.")
+        self.cache.close()
+        self.absent.close()
+        await self.storage.close()
+
+    def is_active(self, session: typing.Optional[dict]) -> bool:
+        return (
+            bool(session) and datetime.utcnow() - session["last_active"] < self.timeout
+        )
+
+    async def get(self, thread_id: int) -> typing.Optional[dict]:
+        """The thread's session (even if expired), or None if it has none."""
+        session = self.cache.get(thread_id)
+        if session is not None:
+            return session
+        if self.absent.get(thread_id):
+            return None
+
+        session = await self.storage.get(thread_id)
+        if session is None:
+            self.absent.set(thread_id, True)
+            return None
+        self._remember(session)
+        if thread_id not in self._scheduled:
+            self._schedule(thread_id, session["last_active"])
+        return session
+
+    async def get_many(self, thread_ids: list[int]) -> dict[int, dict]:
+        """
+        {thread_id: session} of the given threads that have one, reading the ones
+        not cached in a single query.
+        """
+        sessions = {}
+        missing = []
+        for thread_id in thread_ids:
+            session = self.cache.get(thread_id)
+            if session is not None:
+                sessions[thread_id] = session
+            elif not self.absent.get(thread_id):
+                missing.append(thread_id)
+        if not missing:
+            return sessions
+
+        loaded = await self.storage.get_many(missing)
+        for thread_id in missing:
+            session = loaded.get(thread_id)
+            if session is None:
+                self.absent.set(thread_id, True)
+            else:
+                sessions[thread_id] = self._remember(session)
+        return sessions
+
+    def _remember(self, session: dict) -> dict:
+        """Caches a session read from the storage, with its unwritten activity."""
+        thread_id = session["thread_id"]
+        if thread_id in self._dirty:
+            session["last_active"] = self._dirty[thread_id]
+        self.cache.set(thread_id, session)
+        self.thread_ids.add(thread_id)
+        return session
+
+    async def save(
+        self,
+        thread_id: int,
+        guild_id: typing.Optional[int],
+        session_id: str,
+        last_active: typing.Optional[datetime] = None,
+    ) -> dict:
+        """Creates or replaces the thread's session."""
+        session = {
+            "thread_id": thread_id,
+            "guild_id": guild_id,
+            "session_id": session_id,
+            "last_active": last_active or datetime.utcnow(),
+        }
+        await self.storage.save(session)
+        self.cache.set(thread_id, session)
+        self.absent.delete(thread_id)
+        self.thread_ids.add(thread_id)
+        self._dirty.pop(thread_id, None)
+        self._schedule(thread_id, session["last_active"])
+        return session
+
+    def touch(self, thread_id: int):
+        """Marks the thread's session as active now, written on the next flush."""
+        now = datetime.utcnow()
+        session = self.cache.get(thread_id)
+        if session is not None:
+            session["last_active"] = now
+        self._dirty[thread_id] = now
+        if not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def flush(self):
+        """Writes the pending last_active timestamps in one batch."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+
+            batch, self._dirty = self._dirty, {}
+            try:
+                await self.storage.touch_many(batch)
+                self.logger.trace(f"Flushed last_active of {len(batch)} sessions.")
+            except BaseException as e:  # cancelled too, or the batch would be lost
+                if isinstance(e, STORAGE_ERRORS):
+                    self.logger.error(f"Failed to flush session activity: {e}")
+                for thread_id, when in batch.items():
+                    self._dirty.setdefault(thread_id, when)  # newer touches win
+                raise
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except STORAGE_ERRORS:
+                pass  # already logged, retried on the next tick
+            except Exception:
+                self.logger.exception("Unexpected error flushing session activity.")
+
+    async def delete(self, thread_id: int) -> bool:
+        self._dirty.pop(thread_id, None)
+        self._scheduled.pop(thread_id, None)
+        self.thread_ids.discard(thread_id)
+        deleted = await self.storage.delete(thread_id)
+        self.cache.delete(thread_id)
+        self.absent.set(thread_id, True)
+        return deleted
+
+    async def delete_guild(self, guild_id: int) -> int:
+        thread_ids = await self.storage.delete_guild(guild_id)
+        self.thread_ids.difference_update(thread_ids)
+        self.cache.clear()  # rare (admin command), cheaper than tracking guilds
+        return len(thread_ids)
+
+    async def list_guild(self, guild_id: int) -> list[dict]:
+        """Active sessions of a guild, most recent first."""
+        await self.flush()
+        return await self.storage.list_guild(guild_id, datetime.utcnow() - self.timeout)
+
+    # expiry
+
+    def _schedule(self, thread_id: int, last_active: datetime):
+        expires_at = last_active + self.timeout
+        self._scheduled[thread_id] = expires_at
+        heapq.heappush(self._deadlines, (expires_at, thread_id))
+        if self._deadlines[0] == (expires_at, thread_id):
+            self._wakeup.set()  # new earliest deadline
+
+    async def load_deadlines(self):
+        """Schedules the expiry of every stored session not scheduled yet."""
+        await self.flush()
+        await self.storage.purge(datetime.utcnow() - self.retention)
+        async for doc in self.storage.load_all():
+            self.thread_ids.add(doc["thread_id"])
+            if doc["thread_id"] not in self._scheduled:
+                self._schedule(doc["thread_id"], doc["last_active"])
+        self.logger.trace(f"{len(self._scheduled)} session deadlines scheduled.")
+
+    async def next_expired(self) -> list[dict]:
+        """
+        Waits until sessions time out and returns them. They are not deleted, call
+        delete() once their threads are handled.
+        """
+        while True:
+            now = datetime.utcnow()
+            due = []
+            while self._deadlines and self._deadlines[0][0] <= now:
+                due.append(heapq.heappop(self._deadlines))
+
+            # stale entries (rescheduled or deleted since) are just dropped, the
+            # rest is read again in one query: touched sessions are not expired
+            due = [entry for entry in due if self._scheduled.get(entry[1]) == entry[0]]
+            try:
+                sessions = (
+                    await self.get_many([thread_id for _, thread_id in due])
+                    if due
+                    else {}
+                )
+            except BaseException:
+                for entry in due:  # not checked, back to the heap
+                    heapq.heappush(self._deadlines, entry)
+                raise
+
+            expired = []
+            for expires_at, thread_id in due:
+                session = sessions.get(thread_id)
+                if self._scheduled.get(thread_id) != expires_at:
+                    pass  # saved or deleted while reading
+                elif session is None:
+                    del self._scheduled[thread_id]
+                elif self.is_active(session):
+                    self._schedule(thread_id, session["last_active"])
+                else:
+                    del self._scheduled[thread_id]
+                    expired.append(session)
+            if expired:
+                return expired
+
+            self._wakeup.clear()
+            delay = (
+                (self._deadlines[0][0] - datetime.utcnow()).total_seconds()
+                if self._deadlines
+                else None
+            )
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), delay)
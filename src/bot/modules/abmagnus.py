@@ -1,10 +1,11 @@
 import logging
 import os
 
-import aiohttp
 from discord import Interaction, app_commands
 from discord.ext import commands
 
+from src.bot.utils.cache import async_cached
+
 logger = logging.getLogger("bot.module.autobloqueador")
 
 AUTHORIZED_USERS_ID = [
@@ -43,6 +44,20 @@ class AbmagnusModule(commands.Cog):
                 self.bot.tree.remove_command("autobloqueador")
                 logger.info("Comando /autobloqueador removido da árvore de comandos.")
 
+    # cliques repetidos logo após uma atualização bem sucedida reaproveitam o resultado
+    # em vez de disparar outra; falhas não são guardadas para poder tentar de novo
+    @async_cached(ttl=30, key=lambda self: None, is_negative=lambda r: r[0] != 200)
+    async def atualizar(self) -> tuple[int, str]:
+        """Dispara a atualização do Auto-Bloqueador. Retorna (status HTTP, corpo)."""
+        async with self.bot.web_client.get(
+            self.api_url,
+            headers={
+                "Authorization": f"Bearer {self.api_token}",
+                "Content-Type": "application/json",
+            },
+        ) as response:
+            return response.status, await response.text()
+
     class AbmagnusModuleGroup(app_commands.Group):
         def __init__(self, cog: "AbmagnusModule"):
             super().__init__(
@@ -63,26 +78,16 @@ class AbmagnusModule(commands.Cog):
             logger.debug(f"Token: {self.cog.api_token}")
 
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        self.cog.api_url,
-                        headers={
-                            "Authorization": f"Bearer {self.cog.api_token}",
-                            "Content-Type": "application/json",
-                        },
-                    ) as response:
-                        text = await response.text()
-                        if response.status == 200:
-                            await interaction.followup.send(
-                                "✅ Auto-Bloqueador atualizado com sucesso."
-                            )
-                        else:
-                            logger.warning(
-                                f"Erro ao atualizar: {response.status} - {text}"
-                            )
-                            await interaction.followup.send(
-                                f"❌ Erro ao atualizar o Auto-Bloqueador. ({response.status})"
-                            )
+                status, text = await self.cog.atualizar()
+                if status == 200:
+                    await interaction.followup.send(
+                        "✅ Auto-Bloqueador atualizado com sucesso."
+                    )
+                else:
+                    logger.warning(f"Erro ao atualizar: {status} - {text}")
+                    await interaction.followup.send(
+                        f"❌ Erro ao atualizar o Auto-Bloqueador. ({status})"
+                    )
             except Exception as e:
                 logger.exception("Exceção ao tentar atualizar o Auto-Bloqueador:")
                 await interaction.followup.send(f"❌ Erro inesperado: `{e}`")
@@ -1,15 +1,18 @@
 import asyncio
 import logging
+import math
 import re
-import time
 from typing import Optional
 
+import aiohttp
 import discord
-import requests
 from bs4 import BeautifulSoup
 from discord import app_commands
 from discord.ext import commands
 
+from src.bot.utils.cache import async_cached
+from src.bot.utils.ratelimit import RateLimiter, rate_limit
+
 MAX_DISCORD_MESSAGE_LENGTH = 2000
 
 
@@ -34,36 +37,91 @@ def normalizar_numero(input_str: str) -> Optional[str]:
     return numero
 
 
+class ServicoOcupado(Exception):
+    """O limite de consultas ao serviço externo foi atingido."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"tente novamente em {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
 class ConsultaOperadora(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.module_name = "consulta_operadora"
         self.logger = logging.getLogger(f"bot.module.{self.module_name}")
-        self._lock = asyncio.Lock()  # Lock para rate limit global
-        self._last_consulta = (
-            0  # Timestamp da última consulta (fallback, mas lock previne race)
+        # protege o serviço externo: vale para todos, mas só para consultas que
+        # realmente vão até ele (as respondidas pelo cache não contam)
+        self.servico_limiter = RateLimiter(
+            1, 10, burst=3, name=f"{self.module_name}.servico"
+        )
+
+    # mesmo número consultado de novo (ou ao mesmo tempo) não vai ao serviço externo;
+    # "sem informações" é guardado por menos tempo e erros nunca são guardados
+    @async_cached(
+        ttl=6 * 60 * 60,
+        negative_ttl=10 * 60,
+        key=lambda self, numero: numero,
+        max_entries=5000,
+    )
+    async def consultar(self, numero: str) -> Optional[tuple[str, Optional[bool]]]:
+        """
+        Consulta a operadora de um número já normalizado.
+        Retorna (operadora, portado) ou None se o serviço não tiver informações.
+        Levanta aiohttp.ClientError em falhas de requisição, asyncio.TimeoutError se
+        o serviço demorar demais, ValueError se a resposta não puder ser processada e
+        ServicoOcupado se o limite de consultas ao serviço foi atingido.
+        """
+        retry_after = self.servico_limiter.hit()
+        if retry_after:
+            raise ServicoOcupado(retry_after)
+
+        url = "http://consultaoperadora.com.br/site2015/resposta.php"
+        data = {"tipo": "consulta", "numero": numero}
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "User-Agent": "Mozilla/5.0",
+        }
+
+        async with self.bot.web_client.post(
+            url, data=data, headers=headers, timeout=5
+        ) as response:
+            response.raise_for_status()  # Levanta exceção para códigos de erro HTTP
+            content = await response.read()
+
+        # Decodifica a resposta como latin1 e parseia o HTML
+        html = content.decode("latin1")
+        soup = BeautifulSoup(html, "html.parser")
+        elemento = soup.find("div", id="resultado_num")
+        if not elemento:
+            raise ValueError("Elemento de resultado não encontrado")
+
+        texto = re.sub(r"\s+", " ", elemento.get_text()).strip()
+        if not texto:
+            raise ValueError("Resposta vazia do serviço")
+
+        # Extrai as informações usando regex
+        operadora_match = re.search(
+            r"Operadora:\s*(.+?)\s*Portado:", texto, re.IGNORECASE
         )
+        portado_match = re.search(r"Portado:\s*(SIM|NÃO)", texto, re.IGNORECASE)
+
+        operadora = operadora_match.group(1).strip() if operadora_match else None
+        portado = portado_match.group(1).upper() == "SIM" if portado_match else None
+
+        if not operadora:
+            return None
+        return operadora, portado
 
     @app_commands.command(
         name="consultaoperadora",
         description="Consulta a operadora de um número de telefone brasileiro.",
     )
     @app_commands.describe(numero="Número de telefone para consultar (ex: 11999999999)")
+    @rate_limit(3, 60, scope="user")
     async def consultaoperadora(self, interaction: discord.Interaction, numero: str):
         await interaction.response.defer(ephemeral=False)
 
-        # Rate limit global: 1 requisição a cada 30 segundos
-        async with self._lock:
-            current_time = time.time()
-            if current_time - self._last_consulta < 30:
-                wait_time = 30 - (current_time - self._last_consulta)
-                await interaction.followup.send(
-                    f"⏳ Aguarde {wait_time:.0f} segundos antes de usar novamente.",
-                    ephemeral=True,
-                )
-                return
-            self._last_consulta = current_time
-
         # Normaliza o número
         numero_norm = normalizar_numero(numero)
         if not numero_norm:
@@ -76,18 +134,18 @@ class ConsultaOperadora(commands.Cog):
             )
             return
 
-        # Realiza a consulta
-        url = "http://consultaoperadora.com.br/site2015/resposta.php"
-        data = {"tipo": "consulta", "numero": numero_norm}
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "User-Agent": "Mozilla/5.0",
-        }
-
         try:
-            response = requests.post(url, data=data, headers=headers, timeout=5)
-            response.raise_for_status()  # Levanta exceção para códigos de erro HTTP
-        except requests.exceptions.Timeout:
+            resultado = await self.consultar(numero_norm)
+        except ServicoOcupado as e:
+            await interaction.followup.send(
+                embed=discord.Embed(
+                    title="📞 Consulta de Operadora",
+                    description=f"⏳ Muitas consultas no momento, tente novamente em {math.ceil(e.retry_after)}s.",
+                    color=0xFF0000,  # Vermelho para erro
+                )
+            )
+            return
+        except asyncio.TimeoutError:
             await interaction.followup.send(
                 embed=discord.Embed(
                     title="📞 Consulta de Operadora",
@@ -96,7 +154,7 @@ class ConsultaOperadora(commands.Cog):
                 )
             )
             return
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientError as e:
             self.logger.error(f"Erro na requisição: {e}")
             await interaction.followup.send(
                 embed=discord.Embed(
@@ -106,19 +164,6 @@ class ConsultaOperadora(commands.Cog):
                 )
             )
             return
-
-        # Decodifica a resposta como latin1 e parseia o HTML
-        try:
-            html = response.content.decode("latin1")
-            soup = BeautifulSoup(html, "html.parser")
-            elemento = soup.find("div", id="resultado_num")
-            if not elemento:
-                raise ValueError("Elemento de resultado não encontrado")
-
-            texto = re.sub(r"\s+", " ", elemento.get_text()).strip()
-            if not texto:
-                raise ValueError("Resposta vazia do serviço")
-
         except Exception as e:
             self.logger.error(f"Erro ao parsear resposta: {e}")
             await interaction.followup.send(
@@ -130,16 +175,7 @@ class ConsultaOperadora(commands.Cog):
             )
             return
 
-        # Extrai as informações usando regex
-        operadora_match = re.search(
-            r"Operadora:\s*(.+?)\s*Portado:", texto, re.IGNORECASE
-        )
-        portado_match = re.search(r"Portado:\s*(SIM|NÃO)", texto, re.IGNORECASE)
-
-        operadora = operadora_match.group(1).strip() if operadora_match else None
-        portado = portado_match.group(1).upper() == "SIM" if portado_match else None
-
-        if not operadora:
+        if not resultado:
             await interaction.followup.send(
                 embed=discord.Embed(
                     title="📞 Consulta de Operadora",
@@ -148,6 +184,7 @@ class ConsultaOperadora(commands.Cog):
                 )
             )
             return
+        operadora, portado = resultado
 
         # Monta a resposta
         portado_str = (
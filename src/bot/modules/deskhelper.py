@@ -1,17 +1,195 @@
 # src/bot/modules/jointocreate.py
 import asyncio
+import codecs
+import contextlib
+import json
 import logging
+import math
 import os
+import time
 import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
 
 import aiohttp
 import discord
 from discord import Interaction, app_commands
 from discord.ext import commands
 
+import src.bot.utils.resilience as resilience
+from src.bot.core.GuildDataBackend import STORAGE_ERRORS, create_backend
 from src.bot.core.GuildDataManager import GuildDataManager
-from src.bot.utils.database import DatabaseClient
+from src.bot.core.SessionBackend import create_session_backend
+from src.bot.core.SessionStore import SessionStore
+from src.bot.utils.cache import Cache
+from src.bot.utils.others import fold_text
+from src.bot.utils.ratelimit import RateLimiter
+from src.bot.utils.scheduler import FairScheduler, QueueFull
+
+MAX_DISCORD_MESSAGE_LENGTH = 2000
+
+# respostas do chatbot que chegam aos pedaços (o resto é um JSON único)
+STREAM_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "text/plain")
+CHATBOT_ACCEPT = "text/event-stream, application/x-ndjson, application/json"
+
+
+def split_message(text: str, limit: int = MAX_DISCORD_MESSAGE_LENGTH) -> list[str]:
+    """
+    Splits text in chunks of at most `limit` chars, preferably on line breaks or spaces.
+    A chunk only depends on the text before its end, so chunks already sent stay valid
+    while the text grows.
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = max(text.rfind("\n", 0, limit), text.rfind(" ", 0, limit))
+        if cut < limit // 2:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n ") if cut < limit else text[cut:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def parse_stream_event(event) -> tuple[str, Optional[dict]]:
+    """
+    Returns (text chunk, final output) of one streamed chatbot event. Understands plain
+    strings, n8n items ({"type": "item", "content": ...}), token/delta style events and
+    a final {"output": {"message": ..., "executionLink": ...}}.
+    """
+    if isinstance(event, str):
+        return event, None
+    if not isinstance(event, dict):
+        return "", None
+    if isinstance(event.get("output"), dict):
+        return "", event["output"]
+    for key in ("content", "text", "delta", "token"):
+        if isinstance(event.get(key), str):
+            return event[key], None
+    return "", None
+
+
+class StreamingReply:
+    """
+    Posts a chatbot answer in a channel while it is generated: the first message is
+    sent as soon as text arrives and then edited at most once every EDIT_INTERVAL
+    seconds (Discord allows about 5 edits per 5s per channel). Text past 2000 chars
+    continues in follow-up messages. Notices sent with notify() are removed once the
+    answer is shown or discarded.
+    """
+
+    EDIT_INTERVAL = 1.5
+
+    def __init__(
+        self, channel: discord.abc.Messageable, reference: discord.Message = None
+    ):
+        self.channel = channel
+        self.reference = reference
+        self.text = ""
+        self.messages: list[discord.Message] = []
+        self.notices: list[discord.Message] = []
+        self._shown: list[str] = []  # conteúdo atual de cada mensagem enviada
+        self._last_sync = 0.0
+        self._pending: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._discarded = False
+        self.logger = logging.getLogger("bot.module.deskhelper.streaming_reply")
+
+    async def feed(self, chunk: str):
+        self.text += chunk
+        if not self.messages:
+            await self._sync()  # primeiro pedaço vai na hora
+        elif self._pending is None:
+            delay = max(0.0, self._last_sync + self.EDIT_INTERVAL - time.monotonic())
+            self._pending = asyncio.create_task(self._sync_later(delay))
+
+    async def notify(self, content: str):
+        """Sends a status message about the answer, deleted when it is done."""
+        self.notices.append(await self.channel.send(content, reference=self.reference))
+
+    async def finish(self, text: Optional[str] = None):
+        """Shows the final text (defaults to everything fed so far)."""
+        await self._cancel_pending()
+        if text is not None:
+            self.text = text
+        await self._sync()
+        await self._delete(self.notices)
+
+    async def _cancel_pending(self):
+        if self._pending:
+            self._pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._pending
+            self._pending = None
+
+    async def _sync_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._pending = None
+        try:
+            await self._sync()
+        except discord.HTTPException as e:
+            self.logger.warning(f"Erro ao atualizar resposta parcial: {e}")
+
+    async def _sync(self):
+        async with self._lock:
+            if self._discarded:
+                return
+            for i, chunk in enumerate(split_message(self.text)):
+                if i < len(self.messages):
+                    if self._shown[i] != chunk:
+                        await self.messages[i].edit(content=chunk)
+                        self._shown[i] = chunk
+                else:
+                    self.messages.append(
+                        await self.channel.send(
+                            chunk, reference=self.reference if i == 0 else None
+                        )
+                    )
+                    self._shown.append(chunk)
+            self._last_sync = time.monotonic()
+
+    async def discard(self):
+        """Deletes everything already posted (the answer was superseded)."""
+        await self._cancel_pending()
+        # espera um envio em andamento, senão ele postaria depois da limpeza
+        async with self._lock:
+            self._discarded = True
+            await self._delete(self.messages)
+            self._shown.clear()
+        await self._delete(self.notices)
+
+    @staticmethod
+    async def _delete(messages: list[discord.Message]):
+        for message in messages:
+            with contextlib.suppress(discord.HTTPException):
+                await message.delete()
+        messages.clear()
+
+
+class InputBurst:
+    """Consecutive messages of one user in one thread, answered together."""
+
+    def __init__(self):
+        self.parts: list[str] = []  # ainda não enviadas ao chatbot
+        self.sent: list[str] = []  # enviadas na resposta em andamento
+        self.reference: Optional[discord.Message] = None  # última mensagem
+        self.task: Optional[asyncio.Task] = None
+
+
+class PendingThread:
+    """
+    A thread still being created, usable as the channel of answer(): send() waits
+    for the thread, so the chatbot can be queried in the meantime.
+    """
+
+    def __init__(self, task: "asyncio.Task[discord.Thread]"):
+        self.task = task
+
+    async def send(self, *args, **kwargs) -> discord.Message:
+        thread = await self.task
+        return await thread.send(*args, **kwargs)
 
 
 class ModuleDeskHelper(commands.Cog):
@@ -22,13 +200,23 @@ class ModuleDeskHelper(commands.Cog):
         self.logger = logging.getLogger(f"bot.module.{self.module_name}")
 
         # chatbot stuff
-        self.user_cooldowns = {}
+        # um tópico novo por usuário a cada COOLDOWN_SECONDS
         self.COOLDOWN_SECONDS = 3
+        self.mention_limiter = RateLimiter(
+            1, self.COOLDOWN_SECONDS, name=f"{self.module_name}.mention"
+        )
+
+        # mensagens seguidas de um usuário num tópico viram uma só pergunta
+        self.bursts: dict[tuple[int, int], InputBurst] = {}
+        self.DEBOUNCE_SECONDS = float(os.getenv("MOD_DESKHELPER_DEBOUNCE", "2"))
 
-        self.sessions = {}
         self.SESSION_TIMEOUT = timedelta(minutes=15)
         self.QUERY_CHATBOT_URL = os.getenv("MOD_DESKHELPER_QUERYCHATBOT_URL")
         self.QUERY_CHATBOT_TOKEN = os.getenv("MOD_DESKHELPER_QUERYCHATBOT_TOKEN")
+        # limite da resposta inteira, incluindo o streaming, não só do primeiro byte
+        self.QUERY_CHATBOT_TIMEOUT = float(
+            os.getenv("MOD_DESKHELPER_QUERYCHATBOT_TIMEOUT", "120")
+        )
 
         if not self.QUERY_CHATBOT_URL or not self.QUERY_CHATBOT_TOKEN:
 
@@ -37,182 +225,416 @@ class ModuleDeskHelper(commands.Cog):
             )
             raise ValueError("Variáveis de ambiente não configuradas!")
 
-        # MongoDB client e collection
-        db_client = DatabaseClient()
-        collection = db_client.get_collection(f"module-{self.module_name}")
+        # Fila de atendimentos: limite global de chamadas simultâneas ao chatbot,
+        # com uma fila por servidor atendidas em rodízio
+        self.scheduler = FairScheduler(
+            concurrency=int(os.getenv("MOD_DESKHELPER_MAX_CONCURRENCY", "4")),
+            max_queue=int(os.getenv("MOD_DESKHELPER_MAX_QUEUE_PER_GUILD", "10")),
+        )
+
+        # Proteção do backend do chatbot: circuit breaker e hedge opcional
+        self.breaker = resilience.CircuitBreaker(
+            urlsplit(self.QUERY_CHATBOT_URL).netloc,
+            failure_threshold=int(os.getenv("MOD_DESKHELPER_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("MOD_DESKHELPER_BREAKER_RESET", "30")),
+        )
+        self.latency = resilience.LatencyTracker()
+        hedge_percentile = os.getenv("MOD_DESKHELPER_HEDGE_PERCENTILE")
+        self.HEDGE_PERCENTILE = float(hedge_percentile) if hedge_percentile else None
+
+        # Cache de respostas para a primeira pergunta de uma sessão (opcional por
+        # servidor, chave "ANSWER_CACHE" no GDM), indexado por "guild:pergunta"
+        self.answer_cache = Cache(
+            ttl=float(os.getenv("MOD_DESKHELPER_ANSWER_CACHE_TTL", "3600")),
+            max_entries=int(os.getenv("MOD_DESKHELPER_ANSWER_CACHE_SIZE", "500")),
+        )
+        self.answer_cache_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        # troca respondida pelo cache, que o chatbot não viu: vai como contexto
+        # junto da próxima mensagem da sessão (chave: session_id)
+        self.opener_context = Cache(
+            ttl=self.SESSION_TIMEOUT.total_seconds(), max_entries=1000
+        )
 
-        # Instância do GuildDataManager (baseado na collection e nome do módulo)
-        self.gdm = GuildDataManager(collection, module_name=self.module_name)
+        # Backend de armazenamento (Mongo, SQLite ou memória, via GDM_BACKEND)
+        storage = create_backend(f"module-{self.module_name}")
+
+        # Instância do GuildDataManager (baseado no backend e nome do módulo)
+        self.gdm = GuildDataManager(storage, module_name=self.module_name)
+
+        # Sessões do chatbot: uma por tópico em deskhelper-sessions, no mesmo backend
+        self.sessions = SessionStore(
+            create_session_backend(f"{self.module_name}-sessions"),
+            module_name=self.module_name,
+            timeout=self.SESSION_TIMEOUT,
+            retention=timedelta(
+                seconds=int(os.getenv("MOD_DESKHELPER_SESSION_RETENTION", "86400"))
+            ),
+            max_cached=int(os.getenv("MOD_DESKHELPER_SESSION_CACHE_SIZE", "1000")),
+            flush_interval=float(
+                os.getenv("MOD_DESKHELPER_SESSION_FLUSH_INTERVAL", "30")
+            ),
+        )
+        # tópicos de sessões expiradas apagados ao mesmo tempo, no máximo
+        self.CLEANUP_CONCURRENCY = int(
+            os.getenv("MOD_DESKHELPER_CLEANUP_CONCURRENCY", "5")
+        )
+        self.expiry_task = None
+        self.reconcile_task = None
 
         # Adiciona o grupo de comandos
         self.deskhelper_group = self.DeskHelperGroup(self)
         self.bot.tree.add_command(self.deskhelper_group)
 
+    async def cog_load(self):
+        await self.gdm.load(guild.id for guild in self.bot.guilds)
+        try:
+            await self.sessions.setup()
+            # antes de conectar, para o roteador já conhecer todos os tópicos
+            await self.sessions.load_deadlines()
+        except STORAGE_ERRORS as e:
+            self.logger.error(f"Erro ao preparar as sessões: {e}")
+        self.bot.router.monitor(self.sessions.thread_ids)
+        self.expiry_task = asyncio.create_task(self.expire_sessions())
+        if self.bot.is_ready():  # módulo recarregado, o on_ready não vem mais
+            self.start_reconciliation()
+
+    async def cog_unload(self):
+        for burst in self.bursts.values():
+            if burst.task:
+                burst.task.cancel()
+        for task in (self.expiry_task, self.reconcile_task):
+            if task:
+                task.cancel()
+        self.bot.router.unmonitor(self.sessions.thread_ids)
+        self.answer_cache.close()
+        self.opener_context.close()
+        await self.sessions.close()
+        await self.gdm.close()
+
     def __getLogger(self, name):
         return logging.getLogger(f"bot.module.{self.module_name}.{name}")
 
     # Listeners
 
-    # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
-    # TODO: Salvar as sessões criadas no db
-    # TODO: Carregar as sessões do db
-    # TODO: Cadastrar um tempo limite pra cada thread (15min inativo por exemplo, então o cache deve um campo de last_active ou algo assim)
-    # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-
     @commands.Cog.listener()
     async def on_ready(self):
+        self.start_reconciliation()
+
+    def start_reconciliation(self):
+        # em segundo plano, uma vez só (o on_ready se repete a cada reconexão)
+        if self.reconcile_task is None:
+            self.reconcile_task = asyncio.create_task(self.reconcile_sessions())
+
+    async def reconcile_sessions(self):
+        """Startup pass: migrates legacy sessions and schedules every session's expiry."""
         logger = self.__getLogger("load_sessions")
         logger.info("Carregando sessões...")
-        for guild in self.bot.guilds:
-            logger.trace(
-                f"Carregando sessões para o servidor {guild.name} ({guild.id})..."
+        try:
+            await self.gdm.prefetch(guild.id for guild in self.bot.guilds)
+            await asyncio.gather(
+                *(self.migrate_guild_sessions(guild.id) for guild in self.bot.guilds)
             )
-            data = self.gdm.for_guild(guild.id)
-            saved_sessions = data.get("THREAD_SESSIONS") or {}
-            logger.trace(f"Sessões salvas: {saved_sessions}")
-            updated_sessions = {}
+            # as já expiradas vencem na hora e são apagadas pelo expire_sessions
+            await self.sessions.load_deadlines()
+        except Exception:
+            logger.exception("Erro ao carregar as sessões.")
 
-            for thread_id_str, session_data in saved_sessions.items():
-                try:
-                    thread_id = int(thread_id_str)
-                    session_id = session_data["session_id"]
-                    last_active = datetime.fromisoformat(session_data["last_active"])
+    async def migrate_guild_sessions(self, guild_id: int):
+        """Moves the sessions older versions kept in the guild data (THREAD_SESSIONS)."""
+        logger = self.__getLogger("load_sessions")
+        saved_sessions = await self.gdm.get(guild_id, "THREAD_SESSIONS")
+        if saved_sessions is None:
+            return
 
-                    if datetime.utcnow() - last_active >= self.SESSION_TIMEOUT:
-                        # Sessão expirada → tenta deletar o thread
-                        try:
-                            thread = await self.bot.fetch_channel(thread_id)
-                            if isinstance(thread, discord.Thread):
-                                await thread.delete(reason="Sessão de chatbot expirada")
-                                logger.info(
-                                    f"Thread expirada deletada: {thread.name} ({thread_id})"
-                                )
-                        except discord.NotFound:
-                            logger.warning(
-                                f"Thread não encontrada ao tentar deletar: {thread_id}"
-                            )
-                        except Exception as e:
-                            logger.error(f"Erro ao deletar thread {thread_id}: {e}")
-                        continue  # não mantém a sessão
-
-                    # Sessão ainda válida → mantém no cache
-                    self.sessions[thread_id] = {
-                        "session_id": session_id,
-                        "last_active": last_active,
-                    }
-                    updated_sessions[thread_id_str] = {
-                        "session_id": session_id,
-                        "last_active": last_active.isoformat(),
-                    }
+        failed = 0
+        for thread_id_str, session_data in saved_sessions.items():
+            try:
+                thread_id = int(thread_id_str)
+                if await self.sessions.get(thread_id) is None:
+                    await self.sessions.save(
+                        thread_id,
+                        guild_id,
+                        session_data["session_id"],
+                        datetime.fromisoformat(session_data["last_active"]),
+                    )
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Erro ao migrar sessão de thread {thread_id_str}: {e}")
 
-                except Exception as e:
+        if failed:
+            # mantidas no GDM, a migração tenta de novo no próximo início
+            logger.error(
+                f"{failed} de {len(saved_sessions)} sessões do servidor {guild_id} não foram migradas."
+            )
+            return
+        await self.gdm.delete(guild_id, "THREAD_SESSIONS")
+        logger.info(
+            f"{len(saved_sessions)} sessões do servidor {guild_id} migradas para a coleção."
+        )
+
+    async def expire_sessions(self):
+        """Background task: deletes the threads of sessions as they time out."""
+        logger = self.__getLogger("expire_sessions")
+        while True:
+            try:
+                expired = await self.sessions.next_expired()
+                await self.delete_expired_threads(expired)
+            except Exception:
+                logger.exception("Erro ao expirar sessões.")
+                await asyncio.sleep(5)
+
+    async def delete_expired_threads(self, sessions: list[dict]):
+        """Deletes the threads of expired sessions, a few at a time, then the sessions."""
+        logger = self.__getLogger("expire_sessions")
+        semaphore = asyncio.Semaphore(self.CLEANUP_CONCURRENCY)
+
+        async def expire(thread_id: int):
+            async with semaphore:
+                try:
+                    thread = self.bot.get_channel(thread_id)
+                    if thread is None:
+                        thread = await self.bot.fetch_channel(thread_id)
+                    if isinstance(thread, discord.Thread):
+                        await thread.delete(reason="Sessão de chatbot expirada")
+                        logger.info(
+                            f"Thread expirada deletada: {thread.name} ({thread_id})"
+                        )
+                except discord.NotFound:
                     logger.warning(
-                        f"Erro ao carregar sessão de thread {thread_id_str}: {e}"
+                        f"Thread não encontrada ao tentar deletar: {thread_id}"
                     )
+                except Exception as e:
+                    logger.error(f"Erro ao deletar thread {thread_id}: {e}")
+
+                try:
+                    await self.sessions.delete(thread_id)
+                except STORAGE_ERRORS as e:
+                    # a retenção remove a sessão depois
+                    logger.error(f"Erro ao remover a sessão {thread_id}: {e}")
+
+        await asyncio.gather(*(expire(session["thread_id"]) for session in sessions))
 
-            # Salva apenas sessões ainda válidas
-            self.gdm.set(guild.id, "THREAD_SESSIONS", updated_sessions)
+    # o roteador do bot (MessageRouter) só entrega mensagens dos tópicos com sessão
+    # e as que começam mencionando o bot
 
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
-        logger = self.__getLogger("on_message")
-        if message.author.bot or not message.guild:
-            return
+    async def on_monitored_message(self, message: discord.Message) -> None:
+        user_input = message.content.strip()
+        if user_input:
+            self.queue_input(message, user_input)
 
-        now = datetime.utcnow()
-        user_id = message.author.id
+    @commands.Cog.listener()
+    async def on_bot_mention(self, message: discord.Message) -> None:
+        if message.mention_everyone or message.role_mentions:
+            return
 
-        # Debounce global por usuário
-        last_used = self.user_cooldowns.get(user_id)
-        if last_used and (now - last_used).total_seconds() < self.COOLDOWN_SECONDS:
+        # Debounce global por usuário (evita abrir vários tópicos de uma vez)
+        if self.mention_limiter.hit(message.author.id):
             return  # Está em cooldown
 
-        self.user_cooldowns[user_id] = now  # Atualiza o timestamp
-
-        if isinstance(message.channel, discord.Thread):
-            thread_id = message.channel.id
+        raw_content = message.content.strip()
+        for mention in self.bot.router.mentions():
+            if raw_content.startswith(mention):
+                user_input = raw_content[len(mention) :].strip()
+                break
+        else:
+            return
 
-            if str(thread_id) not in self.gdm.get(
-                message.guild.id, "THREAD_SESSIONS", {}
-            ):
-                logger.warning("Message sent in a non-monitored thread!")
-                return
+        if user_input:
+            await self.open_session_thread(message, user_input)
 
-            session_id = self.get_or_create_session(thread_id)
+    # Functions
 
-            user_input = message.content.strip()
-            if not user_input:
-                return
-            response = await self.query_chatbot(
+    async def open_session_thread(self, message: discord.Message, user_input: str):
+        """
+        Opens a support thread for a mention and answers it there. The chatbot is
+        queried while the thread and its session are created, the answer is posted
+        once the thread exists, so the user waits for the slower of the two only.
+        """
+        logger = self.__getLogger("open_session_thread")
+        session_id = str(uuid.uuid4())
+
+        async def create_thread() -> discord.Thread:
+            thread = await message.create_thread(
+                name=f"Atendimento - {message.author.display_name}",
+                auto_archive_duration=60,
+            )
+            try:
+                await self.sessions.save(thread.id, message.guild.id, session_id)
+            except BaseException:
+                # sem sessão o tópico nunca seria atendido nem apagado
+                with contextlib.suppress(discord.HTTPException):
+                    await thread.delete(reason="Falha ao salvar a sessão")
+                raise
+            return thread
+
+        thread_task = asyncio.create_task(create_thread())
+        answer_task = asyncio.create_task(
+            self.answer(
+                PendingThread(thread_task),
+                message.guild.id,
                 session_id,
                 user_input,
-                with_execution_link=self.is_debug_mode(message.guild.id),
+                opener=True,
             )
-            await message.channel.send(response, reference=message)
+        )
+        try:
+            thread = await thread_task
+        except Exception as e:
+            # sem tópico não há onde responder
+            answer_task.cancel()
+            logger.error(f"Erro ao abrir tópico de atendimento: {e}")
+            with contextlib.suppress(discord.HTTPException):
+                await message.reply(
+                    "❌ Não consegui abrir o atendimento, tente novamente em instantes."
+                )
             return
+        except asyncio.CancelledError:
+            thread_task.cancel()
+            answer_task.cancel()
+            raise
+
+        try:
+            async with thread.typing():
+                await answer_task
+        except asyncio.CancelledError:
+            answer_task.cancel()
+            raise
+
+    def queue_input(self, message: discord.Message, user_input: str):
+        """
+        Adds a thread message to its author's burst and (re)starts the debounce: the
+        chatbot is only called once the user stops typing for DEBOUNCE_SECONDS, with
+        all the messages joined. A message arriving while the previous answer is still
+        running cancels it and the new call carries the previous input too.
+        """
+        key = (message.channel.id, message.author.id)
+        burst = self.bursts.get(key)
+        if burst is None:
+            burst = self.bursts[key] = InputBurst()
+
+        if burst.task and not burst.task.done():
+            burst.task.cancel()
+        burst.parts = burst.sent + burst.parts + [user_input]
+        burst.sent = []
+        burst.reference = message
+        burst.task = asyncio.create_task(self._answer_burst(key, burst))
+
+    async def _answer_burst(self, key: tuple[int, int], burst: InputBurst):
+        logger = self.__getLogger("answer_burst")
+        await asyncio.sleep(self.DEBOUNCE_SECONDS)
+
+        burst.sent, burst.parts = burst.parts, []
+        message = burst.reference
+        try:
+            opener = not await self.has_active_session(message.channel.id)
+            session_id = await self.get_or_create_session(
+                message.channel.id, message.guild.id
+            )
+            await self.answer(
+                message.channel,
+                message.guild.id,
+                session_id,
+                "\n".join(burst.sent),
+                reference=message,
+                opener=opener,
+            )
+        except asyncio.CancelledError:
+            logger.debug(f"Resposta substituída por nova mensagem em {key}")
+            raise
+        except Exception as e:
+            logger.exception(f"Erro ao responder {key}: {e}")
+        finally:
+            if burst.task is asyncio.current_task():
+                self.bursts.pop(key, None)
+
+    async def answer(
+        self,
+        channel: discord.abc.Messageable,
+        guild_id: int,
+        session_id: str,
+        user_input: str,
+        reference: discord.Message = None,
+        opener: bool = False,
+    ):
+        """
+        Answers user_input in channel with the chatbot, waiting for its turn in the queue.
+        The first message of a session (opener) may be answered from the answer cache.
+        """
+        logger = self.__getLogger("answer")
+        reply = StreamingReply(channel, reference=reference)
+        with_execution_link = await self.is_debug_mode(guild_id)
+
+        cache_key = None
+        if opener and await self.gdm.get(guild_id, "ANSWER_CACHE", False):
+            cache_key = self.answer_cache_key(guild_id, user_input)
+        if cache_key:
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                self.answer_cache_stats[guild_id]["hits"] += 1
+                self.opener_context.set(session_id, (user_input, cached))
+                if with_execution_link:
+                    cached = f"{cached}\n\n-# (resposta em cache)"
+                await reply.finish(cached)
+                return
+            self.answer_cache_stats[guild_id]["misses"] += 1
+        elif not opener:
+            context = self.opener_context.get(session_id)
+            if context:
+                self.opener_context.delete(session_id)
+                question, cached = context
+                user_input = (
+                    f'(Contexto: esta conversa começou com a pergunta "{question}", '
+                    f'respondida com "{cached}".)\n\n{user_input}'
+                )
 
-        if (
-            self.bot.user.mentioned_in(message)
-            and not message.mention_everyone
-            and not message.role_mentions
-        ):
-            raw_content = message.content.strip()
-            bot_mentions = [f"<@{self.bot.user.id}>", f"<@!{self.bot.user.id}>"]
-
-            if any(raw_content.startswith(m) for m in bot_mentions):
-                for mention in bot_mentions:
-                    if raw_content.startswith(mention):
-                        user_input = raw_content[len(mention) :].strip()
-                        break
-
-                if not user_input:
-                    return
+        async def on_queued(position: int):
+            await reply.notify(
+                f"⏳ Muitos atendimentos no momento, sua mensagem está na posição {position} da fila."
+            )
 
-                thread = await message.create_thread(
-                    name=f"Atendimento - {message.author.display_name}",
-                    auto_archive_duration=60,
-                )
+        async def query() -> str:
+            return await self.query_chatbot(
+                session_id,
+                user_input,
+                with_execution_link=with_execution_link,
+                on_text=reply.feed,
+                cache_key=cache_key,
+            )
 
-                session_id = self.get_or_create_session(thread.id)
+        try:
+            response = await self.scheduler.run(guild_id, query, on_queued=on_queued)
+        except asyncio.CancelledError:
+            await reply.discard()  # a resposta parcial não vale mais
+            raise
+        except QueueFull:
+            logger.warning(f"Fila do servidor {guild_id} cheia, mensagem descartada.")
+            await channel.send(
+                "🚦 Estou com muitas mensagens deste servidor na fila, tente novamente em instantes.",
+                reference=reference,
+            )
+            return
+        await reply.finish(response)
 
-                response = await self.query_chatbot(
-                    session_id,
-                    user_input,
-                    with_execution_link=self.is_debug_mode(message.guild.id),
-                )
-                await thread.send(response)
+    def answer_cache_key(self, guild_id: int, question: str) -> Optional[str]:
+        folded = fold_text(question)
+        return f"{guild_id}:{folded}" if folded else None
 
-    # Functions
+    async def has_active_session(self, thread_id: int) -> bool:
+        return self.sessions.is_active(await self.sessions.get(thread_id))
 
-    def is_debug_mode(self, guild_id: int) -> bool:
-        data = self.gdm.for_guild(guild_id)
+    async def is_debug_mode(self, guild_id: int) -> bool:
+        data = await self.gdm.for_guild(guild_id)
         return data.get("DEBUG_MODE", False)
 
-    def get_or_create_session(self, thread_id: int) -> str:
-        now = datetime.utcnow()
-        session = self.sessions.get(thread_id)
+    async def get_or_create_session(self, thread_id: int, guild_id: int) -> str:
+        session = await self.sessions.get(thread_id)
 
-        if session and now - session["last_active"] < self.SESSION_TIMEOUT:
-            session["last_active"] = now
-        else:
-            session = {
-                "session_id": str(uuid.uuid4()),
-                "last_active": now,
-            }
-            self.sessions[thread_id] = session
-
-        # Salva no GDM
-        guild_id = self.get_guild_id_from_thread_id(thread_id)
-
-        if guild_id:
-            data = self.gdm.for_guild(guild_id)
-            data_sessions = data.get("THREAD_SESSIONS") or {}
-            data_sessions[str(thread_id)] = {
-                "session_id": session["session_id"],
-                "last_active": session["last_active"].isoformat(),
-            }
-            self.gdm.set(guild_id, "THREAD_SESSIONS", data_sessions)
+        if self.sessions.is_active(session):
+            self.sessions.touch(thread_id)
+            return session["session_id"]
 
+        session = await self.sessions.save(thread_id, guild_id, str(uuid.uuid4()))
         return session["session_id"]
 
     def get_guild_id_from_thread_id(self, thread_id: int) -> int | None:
@@ -222,67 +644,191 @@ class ModuleDeskHelper(commands.Cog):
         return None
 
     async def query_chatbot(
-        self, session_id: str, user_input: str, with_execution_link: bool = False
+        self,
+        session_id: str,
+        user_input: str,
+        with_execution_link: bool = False,
+        on_text: Optional[Callable[[str], Awaitable]] = None,
+        cache_key: Optional[str] = None,
     ) -> str:
+        """
+        Sends the user input to the chatbot and returns its full answer, which is also
+        stored in the answer cache under `cache_key` if given.
+        If the endpoint streams the answer (SSE, NDJSON or chunked text), every piece of
+        text is also handed to `on_text` as soon as it arrives.
+        Calls go through the endpoint's circuit breaker and, if configured, are hedged
+        with a second request when slower than the latency percentile.
+        """
         logger = self.__getLogger("query_chatbot")
-        url = self.QUERY_CHATBOT_URL
         payload = {
             "sessionId": session_id,
             "chatInput": user_input,
         }
 
-        headers = {"Authorization": f"Bearer {self.QUERY_CHATBOT_TOKEN}"}
-
         max_retries = 3
         backoff_base = 1  # segundos
 
         for attempt in range(1, max_retries + 1):
+            shown = []  # pedaços já repassados a on_text
+            owner = None  # requisição (do hedge) cujo texto está sendo mostrado
+            display = on_text
+
+            def request(i: int):
+                async def feed(text: str):
+                    nonlocal owner, display
+                    if owner is None:
+                        owner = i
+                    if owner == i:
+                        shown.append(text)
+                        if display is None:
+                            return
+                        try:
+                            await display(text)
+                        except Exception as e:
+                            # falha do Discord (ou ao criar o tópico), não do chatbot:
+                            # não pode contar no circuit breaker
+                            logger.warning(f"Erro ao mostrar resposta parcial: {e}")
+                            display = None
+
+                if i and owner is not None:
+                    # a primeira já está mostrando a resposta, não vale duplicar
+                    return self._skip_hedge()
+                return self._chatbot_request(payload, feed)
+
             try:
                 logger.debug(f"Tentativa {attempt} - Enviando payload: {payload}")
+                output = await self.breaker.call(
+                    lambda: resilience.hedged(request, self.hedge_delay())
+                )
+            except resilience.CircuitOpen as e:
+                logger.warning(f"Chatbot indisponível: {e}")
+                return (
+                    "🔌 O assistente está indisponível no momento, "
+                    f"tente novamente em {math.ceil(e.retry_after)}s."
+                )
+            except Exception as e:
+                logger.error(f"Erro na tentativa {attempt}: {e}")
 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, json=payload, headers=headers) as resp:
-                        logger.debug(f"Resposta HTTP: {resp.status}")
+                if shown:
+                    # parte da resposta já foi mostrada, repetir duplicaria o texto
+                    return "".join(shown) + "\n\n-# (resposta interrompida)"
 
-                        if resp.status != 200:
-                            logger.warning(
-                                f"Status inesperado ({resp.status}) na tentativa {attempt}"
-                            )
-                            raise aiohttp.ClientError(f"Status code {resp.status}")
+                if attempt < max_retries:
+                    wait_time = resilience.full_jitter(attempt, base=backoff_base)
+                    logger.info(
+                        f"Aguardando {wait_time:.1f}s antes da próxima tentativa..."
+                    )
+                    await asyncio.sleep(wait_time)
+                    continue
 
-                        data = await resp.json()
-                        logger.debug(f"Resposta JSON recebida: {data}")
+                logger.critical(
+                    "Todas as tentativas de contato com o chatbot falharam."
+                )
+                return "Erro no chatbot!"
 
-                        if (
-                            isinstance(data, dict)
-                            and "output" in data
-                            and "message" in data["output"]
-                        ):
-                            message = data["output"]["message"]
-                            execution_link = data["output"]["executionLink"]
+            message = output["message"]
+            execution_link = output.get("executionLink")
+            if cache_key:
+                self.answer_cache.set(cache_key, message)
 
-                            if with_execution_link:
-                                message = f"{message}\n\n-# [[Ver execução]({execution_link})]"
+            if with_execution_link and execution_link:
+                message = f"{message}\n\n-# [[Ver execução]({execution_link})]"
 
-                            return message
-                        else:
-                            logger.error("Formato inválido de resposta do chatbot.")
-                            raise ValueError("Formato inválido de resposta do chatbot.")
+            return message
 
-            except Exception as e:
-                logger.error(f"Erro na tentativa {attempt}: {e}")
+    def hedge_delay(self) -> Optional[float]:
+        """Latency after which a second request is fired, None when hedging is off."""
+        if self.HEDGE_PERCENTILE is None:
+            return None
+        return self.latency.percentile(self.HEDGE_PERCENTILE)
 
-                if attempt < max_retries:
-                    wait_time = backoff_base * 2 ** (attempt - 1)
-                    logger.info(
-                        f"Aguardando {wait_time}s antes da próxima tentativa..."
-                    )
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.critical(
-                        "Todas as tentativas de contato com o chatbot falharam."
-                    )
-                    return "Erro no chatbot!"
+    async def _skip_hedge(self):
+        raise RuntimeError("hedge dispensado")
+
+    async def _chatbot_request(
+        self, payload: dict, on_text: Callable[[str], Awaitable]
+    ) -> dict:
+        """One HTTP call to the chatbot. Returns its output ({"message", "executionLink"})."""
+        logger = self.__getLogger("query_chatbot")
+        headers = {
+            "Authorization": f"Bearer {self.QUERY_CHATBOT_TOKEN}",
+            "Accept": CHATBOT_ACCEPT,
+        }
+        started_at = time.monotonic()
+
+        async with self.bot.web_client.post(
+            self.QUERY_CHATBOT_URL,
+            json=payload,
+            headers=headers,
+            timeout=self.QUERY_CHATBOT_TIMEOUT,
+        ) as resp:
+            logger.debug(f"Resposta HTTP: {resp.status}")
+
+            if resp.status != 200:
+                logger.warning(f"Status inesperado ({resp.status})")
+                raise aiohttp.ClientError(f"Status code {resp.status}")
+
+            if resp.content_type in STREAM_CONTENT_TYPES:
+                output = await self._read_chatbot_stream(resp, [], on_text)
+            else:
+                data = await resp.json()
+                logger.debug(f"Resposta JSON recebida: {data}")
+                output = data.get("output") if isinstance(data, dict) else None
+
+        if not isinstance(output, dict) or not output.get("message"):
+            logger.error("Formato inválido de resposta do chatbot.")
+            raise ValueError("Formato inválido de resposta do chatbot.")
+
+        self.latency.record(time.monotonic() - started_at)
+        return output
+
+    async def _read_chatbot_stream(
+        self,
+        resp: aiohttp.ClientResponse,
+        streamed: list[str],
+        on_text: Optional[Callable[[str], Awaitable]],
+    ) -> dict:
+        """
+        Reads a streamed chatbot answer, appending each text piece to `streamed` and
+        handing it to `on_text`. Returns the output ({"message", "executionLink"}),
+        the one sent by the stream itself if any, else built from the pieces.
+        """
+        output = None
+
+        async def handle(event):
+            nonlocal output
+            text, final = parse_stream_event(event)
+            if final is not None:
+                output = final
+            if text:
+                streamed.append(text)
+                if on_text:
+                    await on_text(text)
+
+        if resp.content_type == "text/plain":
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            async for data in resp.content.iter_any():
+                await handle(decoder.decode(data))
+        else:
+            sse = resp.content_type == "text/event-stream"
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if sse:
+                    if not line.startswith("data:"):
+                        continue  # comentários, event:, id:, retry:
+                    line = line[len("data:") :].strip()
+                    if line == "[DONE]":
+                        break
+                if not line:
+                    continue
+                try:
+                    await handle(json.loads(line))
+                except json.JSONDecodeError:
+                    await handle(line)
+
+        if output is None or "message" not in output:
+            output = {**(output or {}), "message": "".join(streamed)}
+        return output
 
     class DeskHelperGroup(app_commands.Group):
         def __init__(self, cog: "ModuleDeskHelper"):
@@ -304,10 +850,9 @@ class ModuleDeskHelper(commands.Cog):
             name="clear-sessions", description="Limpa todas as sessões"
         )
         async def clear_sessions(self, interaction: Interaction):
-            self.cog.sessions.clear()
             guild_id = interaction.guild_id
             if guild_id:
-                self.cog.gdm.set(guild_id, "THREAD_SESSIONS", {})
+                await self.cog.sessions.delete_guild(guild_id)
             await interaction.response.send_message(
                 "✅ Todas as sessões foram limpas.", ephemeral=True
             )
@@ -317,22 +862,7 @@ class ModuleDeskHelper(commands.Cog):
         )
         @app_commands.describe(thread="Tópico (thread) cuja sessão será removida")
         async def session_clear(self, interaction: Interaction, thread: discord.Thread):
-            removed = False
-
-            if thread.id in self.cog.sessions:
-                del self.cog.sessions[thread.id]
-                removed = True
-
-            guild_id = interaction.guild_id
-            if guild_id:
-                data = self.cog.gdm.for_guild(guild_id)
-                sessions = data.get("THREAD_SESSIONS") or {}
-                if str(thread.id) in sessions:
-                    del sessions[str(thread.id)]
-                    self.cog.gdm.set(guild_id, "THREAD_SESSIONS", sessions)
-                    removed = True
-
-            if removed:
+            if await self.cog.sessions.delete(thread.id):
                 await interaction.response.send_message(
                     f"✅ Sessão do tópico `{thread.name}` removida.", ephemeral=True
                 )
@@ -349,11 +879,7 @@ class ModuleDeskHelper(commands.Cog):
         async def session_set(
             self, interaction: Interaction, thread: discord.Thread, session_id: str
         ):
-            now = datetime.utcnow()
-            self.cog.sessions[thread.id] = {
-                "session_id": session_id,
-                "last_active": now,
-            }
+            await self.cog.sessions.save(thread.id, thread.guild.id, session_id)
             await interaction.response.send_message(
                 f"✅ Sessão do tópico `{thread.name}` definida como `{session_id}`.",
                 ephemeral=True,
@@ -364,8 +890,8 @@ class ModuleDeskHelper(commands.Cog):
         )
         @app_commands.describe(thread="Tópico")
         async def session_get(self, interaction: Interaction, thread: discord.Thread):
-            session = self.cog.sessions.get(thread.id)
-            if session:
+            session = await self.cog.sessions.get(thread.id)
+            if self.cog.sessions.is_active(session):
                 sid = session["session_id"]
                 last = session["last_active"].isoformat()
                 await interaction.response.send_message(
@@ -384,8 +910,8 @@ class ModuleDeskHelper(commands.Cog):
         )
         @app_commands.describe(thread="Tópico cuja sessão será copiada")
         async def session_copy(self, interaction: Interaction, thread: discord.Thread):
-            source_session = self.cog.sessions.get(thread.id)
-            if not source_session:
+            source_session = await self.cog.sessions.get(thread.id)
+            if not self.cog.sessions.is_active(source_session):
                 await interaction.response.send_message(
                     f"❌ O tópico `{thread.name}` não possui uma sessão ativa.",
                     ephemeral=True,
@@ -415,10 +941,9 @@ class ModuleDeskHelper(commands.Cog):
             )
 
             # Copia a sessão
-            self.cog.sessions[new_thread.id] = {
-                "session_id": source_session["session_id"],
-                "last_active": datetime.utcnow(),
-            }
+            await self.cog.sessions.save(
+                new_thread.id, new_thread.guild.id, source_session["session_id"]
+            )
 
             await interaction.response.send_message(
                 f"✅ Sessão copiada de `{thread.name}` para o novo tópico: {new_thread.mention}",
@@ -429,14 +954,16 @@ class ModuleDeskHelper(commands.Cog):
             name="session-list", description="Lista todas as sessões ativas"
         )
         async def session_list(self, interaction: Interaction):
-            if not self.cog.sessions:
+            sessions = await self.cog.sessions.list_guild(interaction.guild_id)
+            if not sessions:
                 await interaction.response.send_message(
                     "ℹ️ Nenhuma sessão ativa.", ephemeral=True
                 )
                 return
 
             lines = []
-            for thread_id, sess in self.cog.sessions.items():
+            for sess in sessions:
+                thread_id = sess["thread_id"]
                 thread = interaction.guild.get_thread(thread_id)
                 timestamp = int(sess["last_active"].timestamp())
                 timestamp -= 3 * 60 * 60  # utc-3
@@ -455,16 +982,106 @@ class ModuleDeskHelper(commands.Cog):
                 "📋 Sessões ativas:\n" + "\n".join(lines), ephemeral=True
             )
 
+        @app_commands.command(
+            name="status", description="Mostra o estado e as métricas do chatbot"
+        )
+        async def status(self, interaction: Interaction):
+            stats = self.cog.scheduler.stats()
+            wait, service = stats["wait"], stats["service"]
+            breaker = self.cog.breaker.stats()
+            state = {
+                "closed": "🟢 disponível",
+                "half_open": "🟡 testando recuperação",
+                "open": f"🔴 indisponível (nova tentativa em {breaker['retry_after']:.0f}s)",
+            }[breaker["state"]]
+            p50 = self.cog.latency.percentile(50)
+            p95 = self.cog.latency.percentile(95)
+            latency = (
+                f"p50 {p50:.1f}s, p95 {p95:.1f}s" if p50 is not None else "poucos dados"
+            )
+            hedge = (
+                f"acima do p{self.cog.HEDGE_PERCENTILE:g}"
+                if self.cog.HEDGE_PERCENTILE is not None
+                else "desativado"
+            )
+            host = urlsplit(self.cog.QUERY_CHATBOT_URL).netloc
+            http = self.cog.bot.web_client.stats().get(host)
+            http_line = (
+                f"- HTTP: {http['requests']} requisições, {http['errors']} erros, "
+                f"média {http['avg_ms']:.0f}ms, máx {http['max_ms']:.0f}ms, "
+                f"status {http['statuses']}\n"
+                if http
+                else "- HTTP: nenhuma requisição ainda\n"
+            )
+            await interaction.response.send_message(
+                f"🔌 Chatbot: {state}\n"
+                f"- Falhas seguidas: **{breaker['failures']}** "
+                f"(total {breaker['total_failures']}, recusadas {breaker['rejected']})\n"
+                f"- Latência: {latency} | Hedge: {hedge}\n"
+                f"{http_line}"
+                "📊 Fila do chatbot:\n"
+                f"- Em atendimento: **{stats['running']}**/{self.cog.scheduler.concurrency}\n"
+                f"- Na fila: **{stats['queued']}** ({stats['queued_keys']} servidores)\n"
+                f"- Recusadas (fila cheia): **{stats['rejected']}**\n"
+                f"- Espera: média {wait['avg']:.1f}s, máx {wait['max']:.1f}s\n"
+                f"- Atendimento: média {service['avg']:.1f}s, máx {service['max']:.1f}s "
+                f"({service['count']} respostas)",
+                ephemeral=True,
+            )
+
+        @app_commands.command(
+            name="answer-cache",
+            description="Ativa ou desativa o cache de respostas para primeiras perguntas",
+        )
+        @app_commands.describe(ativar="Se as primeiras perguntas podem vir do cache")
+        async def answer_cache(self, interaction: Interaction, ativar: bool):
+            guild_id = interaction.guild_id
+            await self.cog.gdm.set(guild_id, "ANSWER_CACHE", ativar)
+            if not ativar:
+                self.cog.answer_cache.delete_prefix(f"{guild_id}:")
+            await interaction.response.send_message(
+                f"🗃️ Cache de respostas {'ativado' if ativar else 'desativado'}.",
+                ephemeral=True,
+            )
+
+        @app_commands.command(
+            name="answer-cache-purge",
+            description="Remove as respostas em cache deste servidor",
+        )
+        async def answer_cache_purge(self, interaction: Interaction):
+            removed = self.cog.answer_cache.delete_prefix(f"{interaction.guild_id}:")
+            await interaction.response.send_message(
+                f"🧹 {removed} respostas removidas do cache.", ephemeral=True
+            )
+
+        @app_commands.command(
+            name="answer-cache-stats",
+            description="Mostra o aproveitamento do cache de respostas",
+        )
+        async def answer_cache_stats(self, interaction: Interaction):
+            guild_id = interaction.guild_id
+            enabled = await self.cog.gdm.get(guild_id, "ANSWER_CACHE", False)
+            stats = self.cog.answer_cache_stats[guild_id]
+            lookups = stats["hits"] + stats["misses"]
+            hit_rate = 100 * stats["hits"] / lookups if lookups else 0.0
+            entries = len(self.cog.answer_cache.find(startswith=f"{guild_id}:"))
+            await interaction.response.send_message(
+                f"🗃️ Cache de respostas: {'ativado' if enabled else 'desativado'}\n"
+                f"- Respostas guardadas: **{entries}**\n"
+                f"- Acertos: **{stats['hits']}** / {lookups} ({hit_rate:.0f}%)",
+                ephemeral=True,
+            )
+
         @app_commands.command(
             name="debug", description="Ativa o modo de depuração baseado em GDM"
         )
         async def debug(self, interaction: Interaction):
             guild_id = interaction.guild.id
-            current = self.cog.gdm.get(guild_id, "DEBUG_MODE") or False
+            current = await self.cog.gdm.get(guild_id, "DEBUG_MODE") or False
             new_state = not current
 
             # Salva apenas a chave "DEBUG_MODE"
-            self.cog.gdm.set(guild_id, "DEBUG_MODE", new_state)
+            await self.cog.gdm.set(guild_id, "DEBUG_MODE", new_state)
 
             await interaction.response.send_message(
                 f"🛠️ Modo de depuração {'ativado' if new_state else 'desativado'}.",
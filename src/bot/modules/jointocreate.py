@@ -1,12 +1,15 @@
 # src/bot/modules/jointocreate.py
+import asyncio
 import logging
+import os
+from datetime import datetime
 
 import discord
 from discord import Interaction, Member, VoiceChannel, app_commands
 from discord.ext import commands
 
+from src.bot.core.GuildDataBackend import create_backend
 from src.bot.core.GuildDataManager import GuildDataManager
-from src.bot.utils.database import DatabaseClient
 
 
 class ModuleJoinToCreate(commands.Cog):
@@ -15,22 +18,145 @@ class ModuleJoinToCreate(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.logger = logging.getLogger(f"bot.module.{self.module_name}")
+        # canais temporários existentes; persistidos em TEMP_CHANNELS
+        # (channel_id: {"owner", "created_at"}) para sobreviver a reinícios
         self.temporary_channels = set()
+        self.reconcile_task = None
+        self.CLEANUP_BATCH_SIZE = int(
+            os.getenv("MOD_JOINTOCREATE_CLEANUP_BATCH_SIZE", "5")
+        )
+        self.CLEANUP_BATCH_DELAY = float(
+            os.getenv("MOD_JOINTOCREATE_CLEANUP_BATCH_DELAY", "1")
+        )
+        # guild_id: ids dos canais Join-To-Create (cópia de ID_JTC_CHANNELS), para
+        # descartar eventos de voz irrelevantes sem consultar o GDM
+        self.jtc_channels: dict[int, frozenset[int]] = {}
 
-        # MongoDB client e collection
-        db_client = DatabaseClient()
-        collection = db_client.get_collection(f"module-{self.module_name}")
+        # Backend de armazenamento (Mongo, SQLite ou memória, via GDM_BACKEND)
+        storage = create_backend(f"module-{self.module_name}")
 
-        # Instância do GuildDataManager (baseado na collection e nome do módulo)
-        self.gdm = GuildDataManager(collection, module_name=self.module_name)
+        # Instância do GuildDataManager (baseado no backend e nome do módulo)
+        self.gdm = GuildDataManager(storage, module_name=self.module_name)
 
         # Agrupamento de comandos
         self.jointocreate_group = self.JoinToCreateGroup(self)
         self.bot.tree.add_command(self.jointocreate_group)
 
+    async def cog_load(self):
+        await self.gdm.load(guild.id for guild in self.bot.guilds)
+        if self.bot.is_ready():  # módulo recarregado, o on_ready não vem mais
+            self.start_reconciliation()
+
+    async def cog_unload(self):
+        if self.reconcile_task:
+            self.reconcile_task.cancel()
+        await self.gdm.close()
+
     def __getLogger(self, name):
         return logging.getLogger(f"bot.module.{self.module_name}.{name}")
 
+    async def index_guild(self, guild_id: int) -> frozenset[int]:
+        """(Re)builds the guild's entry of the Join-To-Create channel index."""
+        channels = frozenset(await self.gdm.get(guild_id, "ID_JTC_CHANNELS") or ())
+        self.jtc_channels[guild_id] = channels
+        return channels
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.gdm.preload == "guilds":
+            await self.gdm.prefetch(guild.id for guild in self.bot.guilds)
+        if self.gdm.preload != "none":  # senão, no primeiro evento de cada servidor
+            await asyncio.gather(
+                *(self.index_guild(guild.id) for guild in self.bot.guilds)
+            )
+        self.start_reconciliation()
+
+    def start_reconciliation(self):
+        # em segundo plano, uma vez só (o on_ready se repete a cada reconexão)
+        if self.reconcile_task is None:
+            self.reconcile_task = asyncio.create_task(self.reconcile_channels())
+
+    async def reconcile_channels(self):
+        """
+        Startup pass over the registered temporary channels of every guild (in
+        parallel): empty ones left behind by a restart are deleted, the others are
+        monitored again.
+        """
+        logger = self.__getLogger("reconcile_channels")
+        results = await asyncio.gather(
+            *(self.reconcile_guild(guild) for guild in self.bot.guilds),
+            return_exceptions=True,
+        )
+        for guild, result in zip(self.bot.guilds, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Erro ao verificar canais temporários de {guild.name}: {result}"
+                )
+        logger.info(
+            f"Canais temporários verificados: {len(self.temporary_channels)} em uso."
+        )
+
+    async def reconcile_guild(self, guild: discord.Guild):
+        logger = self.__getLogger("reconcile_channels")
+        registered = await self.gdm.get(guild.id, "TEMP_CHANNELS") or {}
+        orphans = []
+        for channel_id in list(registered):  # o dict do cache muda ao desregistrar
+            channel = guild.get_channel(int(channel_id))
+            if channel is None:
+                await self.gdm.unset_path(guild.id, f"TEMP_CHANNELS.{channel_id}")
+            elif channel.members:
+                self.temporary_channels.add(channel.id)
+            else:
+                orphans.append(channel)
+
+        # em lotes espaçados: deletar canais tem rate limit por servidor
+        deleted = 0
+        for start in range(0, len(orphans), self.CLEANUP_BATCH_SIZE):
+            if start:
+                await asyncio.sleep(self.CLEANUP_BATCH_DELAY)
+            batch = orphans[start : start + self.CLEANUP_BATCH_SIZE]
+            results = await asyncio.gather(
+                *(self.delete_temporary(c) for c in batch), return_exceptions=True
+            )
+            for channel, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    # fica registrado, tenta de novo na próxima reconciliação
+                    logger.error(f"Erro ao deletar canal órfão {channel.id}: {result}")
+                else:
+                    deleted += 1
+        if orphans:
+            logger.info(
+                f"{deleted}/{len(orphans)} canais órfãos deletados em {guild.name}"
+            )
+
+    async def register_temporary(self, channel: discord.VoiceChannel, owner_id: int):
+        self.temporary_channels.add(channel.id)
+        await self.gdm.set_path(
+            channel.guild.id,
+            f"TEMP_CHANNELS.{channel.id}",
+            {"owner": owner_id, "created_at": datetime.utcnow().isoformat()},
+        )
+
+    async def delete_temporary(self, channel: discord.abc.GuildChannel):
+        try:
+            await channel.delete()
+        except discord.NotFound:
+            pass  # já deletado
+        await self.forget_temporary(channel)
+
+    async def forget_temporary(self, channel: discord.abc.GuildChannel):
+        self.temporary_channels.discard(channel.id)
+        await self.gdm.unset_path(channel.guild.id, f"TEMP_CHANNELS.{channel.id}")
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if channel.id in self.temporary_channels:  # deletado manualmente
+            await self.forget_temporary(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.jtc_channels.pop(guild.id, None)
+
     @commands.Cog.listener()
     async def on_voice_state_update(
         self,
@@ -38,10 +164,21 @@ class ModuleJoinToCreate(commands.Cog):
         before: discord.VoiceState,
         after: discord.VoiceState,
     ) -> None:
+        before_id = before.channel.id if before.channel else None
+        after_id = after.channel.id if after.channel else None
+        if before_id == after_id:
+            return  # mute, deafen, stream... sem troca de canal
+
+        monitored_channels = self.jtc_channels.get(member.guild.id)
+        if monitored_channels is None:
+            monitored_channels = await self.index_guild(member.guild.id)
+        if (
+            after_id not in monitored_channels
+            and before_id not in self.temporary_channels
+        ):
+            return  # nada a fazer: não entrou em canal monitorado nem saiu de temporário
+
         logger = self.__getLogger("on_voice_state_update")
-        guild_id = member.guild.id
-        data = self.gdm.for_guild(guild_id)
-        monitored_channels = data.get("ID_JTC_CHANNELS") or []
 
         # Verifica se o bot tem permissão para criar/deletar canais
         bot_member = member.guild.me
@@ -50,13 +187,13 @@ class ModuleJoinToCreate(commands.Cog):
             return
 
         # Quando o membro entra em um canal monitorado
-        if after.channel and after.channel.id in monitored_channels:
+        if after_id in monitored_channels:
             category = after.channel.category  # mantém a categoria do canal original
             member_id = str(member.id)
             member_display_name = member.display_name
 
             # Busca alias personalizado
-            data = self.gdm.for_guild(member.guild.id)
+            data = await self.gdm.for_guild(member.guild.id)
             aliases = data.get("TEMP_CHANNEL_ALIASES") or {}
             alias = aliases.get(f"{member_id}")  # key is a string
 
@@ -83,7 +220,7 @@ class ModuleJoinToCreate(commands.Cog):
                 name=channel_name, category=category, overwrites=overwrites
             )
 
-            self.temporary_channels.add(new_channel.id)
+            await self.register_temporary(new_channel, member.id)
             logger.info(
                 f"Criado novo canal: {new_channel.name} para {member_display_name}"
             )
@@ -98,8 +235,7 @@ class ModuleJoinToCreate(commands.Cog):
                 len(before.channel.members) == 0
                 and before.channel.id in self.temporary_channels  # noqa
             ):
-                await before.channel.delete()
-                self.temporary_channels.remove(before.channel.id)
+                await self.delete_temporary(before.channel)
                 logger.info(f"Canal temporário deletado: {before.channel.name}")
 
     class JoinToCreateGroup(app_commands.Group):
@@ -123,7 +259,7 @@ class ModuleJoinToCreate(commands.Cog):
         )
         @app_commands.describe(channel="Canal de voz que será usado")
         async def create(self, interaction: Interaction, channel: VoiceChannel):
-            data = self.cog.gdm.for_guild(
+            data = await self.cog.gdm.for_guild(
                 interaction.guild_id
             )  # pega o dicionário cacheado
             channels = data.get("ID_JTC_CHANNELS") or []
@@ -134,10 +270,10 @@ class ModuleJoinToCreate(commands.Cog):
                 )
                 return
 
-            channels.append(channel.id)
-
-            self.cog.gdm.set(interaction.guild_id, "ID_JTC_CHANNELS", channels)
-            data["ID_JTC_CHANNELS"] = channels
+            await self.cog.gdm.add_to_set(
+                interaction.guild_id, "ID_JTC_CHANNELS", channel.id
+            )
+            await self.cog.index_guild(interaction.guild_id)
 
             await interaction.response.send_message(
                 f"✅ Canal {channel.mention} cadastrado como Join-To-Create!",
@@ -149,7 +285,7 @@ class ModuleJoinToCreate(commands.Cog):
         )
         @app_commands.describe(channel="Canal de voz a ser removido")
         async def delete(self, interaction: Interaction, channel: VoiceChannel):
-            data = self.cog.gdm.for_guild(interaction.guild_id)
+            data = await self.cog.gdm.for_guild(interaction.guild_id)
             channels = data.get("ID_JTC_CHANNELS") or []
 
             if channel.id not in channels:
@@ -158,10 +294,8 @@ class ModuleJoinToCreate(commands.Cog):
                 )
                 return
 
-            channels.remove(channel.id)
-
-            self.cog.gdm.set(interaction.guild_id, "ID_JTC_CHANNELS", channels)
-            data["ID_JTC_CHANNELS"] = channels
+            await self.cog.gdm.pull(interaction.guild_id, "ID_JTC_CHANNELS", channel.id)
+            await self.cog.index_guild(interaction.guild_id)
 
             await interaction.response.send_message(
                 f"✅ Canal {channel.mention} removido com sucesso!", ephemeral=True
@@ -171,7 +305,7 @@ class ModuleJoinToCreate(commands.Cog):
             name="list", description="Lista os canais Join-To-Create configurados"
         )
         async def list(self, interaction: Interaction):
-            data = self.cog.gdm.for_guild(interaction.guild_id)
+            data = await self.cog.gdm.for_guild(interaction.guild_id)
             channel_ids = data.get("ID_JTC_CHANNELS") or []
 
             if not channel_ids:
@@ -199,9 +333,6 @@ class ModuleJoinToCreate(commands.Cog):
         )
         async def set_alias(self, interaction: Interaction, user: Member, alias: str):
             pass
-            data = self.cog.gdm.for_guild(interaction.guild_id)
-            aliases = data.get("TEMP_CHANNEL_ALIASES") or {}
-
             # first, check if alias has more than 100 characters
             if len(alias) > 100:
                 await interaction.response.send_message(
@@ -210,8 +341,9 @@ class ModuleJoinToCreate(commands.Cog):
                 return
 
             # set new alias in guild configuration
-            aliases[f"{user.id}"] = alias
-            self.cog.gdm.set(interaction.guild_id, "TEMP_CHANNEL_ALIASES", aliases)
+            await self.cog.gdm.set_path(
+                interaction.guild_id, f"TEMP_CHANNEL_ALIASES.{user.id}", alias
+            )
 
             await interaction.response.send_message(
                 "✅ Alias definido com sucesso!", ephemeral=True
@@ -222,7 +354,7 @@ class ModuleJoinToCreate(commands.Cog):
             description="Remove o alias de canal temporário para o usuário especificado",
         )
         async def remove_alias(self, interaction: Interaction, user: Member):
-            data = self.cog.gdm.for_guild(interaction.guild_id)
+            data = await self.cog.gdm.for_guild(interaction.guild_id)
             aliases = data.get("TEMP_CHANNEL_ALIASES") or {}
 
             if f"{user.id}" not in aliases:
@@ -232,8 +364,9 @@ class ModuleJoinToCreate(commands.Cog):
                 return
 
             # remove alias from guild configuration
-            del aliases[f"{user.id}"]
-            self.cog.gdm.set(interaction.guild_id, "TEMP_CHANNEL_ALIASES", aliases)
+            await self.cog.gdm.unset_path(
+                interaction.guild_id, f"TEMP_CHANNEL_ALIASES.{user.id}"
+            )
 
             await interaction.response.send_message(
                 "✅ Alias removido com sucesso!", ephemeral=True
@@ -244,7 +377,7 @@ class ModuleJoinToCreate(commands.Cog):
             description="Lista os aliases de canal temporário configurados",
         )
         async def list_aliases(self, interaction: Interaction):
-            data = self.cog.gdm.for_guild(interaction.guild_id)
+            data = await self.cog.gdm.for_guild(interaction.guild_id)
             aliases = data.get("TEMP_CHANNEL_ALIASES") or {}
 
             if not aliases:
@@ -1,25 +1,20 @@
 import logging
 import os
-import re
 import shutil
-import unicodedata
 from io import BytesIO
 
 import discord
-import requests
 from discord import app_commands
 from discord.ext import commands
 from pydub import AudioSegment
 
+from src.bot.utils.cache import async_cached
+from src.bot.utils.others import fold_text
 
-def normalize_audio_name(text: str, word_limit: int = 4) -> str:
-    # Remove acentos
-    text = unicodedata.normalize("NFD", text)
-    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
 
-    text = text.lower()
-    text = re.sub(r"[^\w\s]", " ", text)
-    words = text.split()
+def normalize_audio_name(text: str, word_limit: int = 4) -> str:
+    # Remove acentos, pontuação e maiúsculas
+    words = fold_text(text).split()
 
     if word_limit:
         words = words[:word_limit]
@@ -29,6 +24,10 @@ def normalize_audio_name(text: str, word_limit: int = 4) -> str:
     return normalized
 
 
+class TTSError(Exception):
+    """Falha ao gerar o áudio; a mensagem é mostrada ao usuário."""
+
+
 class TTSCog(commands.Cog):
     module_name = "tts"
 
@@ -48,6 +47,34 @@ class TTSCog(commands.Cog):
     def __getLogger(self, name):
         return logging.getLogger(f"bot.module.{self.module_name}.{name}")
 
+    # a mesma frase gera sempre o mesmo áudio: reaproveita (e agrupa pedidos simultâneos)
+    @async_cached(
+        ttl=60 * 60, key=lambda self, texto: texto, max_bytes=64 * 1024 * 1024
+    )
+    async def gerar_audio(self, texto: str) -> bytes:
+        """Retorna o MP3 gerado pela API de TTS. Levanta TTSError se a API falhar."""
+        url = self.api_url
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        payload = {"text": texto}
+
+        async with self.bot.web_client.post(
+            url, headers=headers, json=payload, timeout=60
+        ) as response:
+            content = await response.read()
+
+            if response.status != 200 or not content:
+                raise TTSError("Erro ao gerar o áudio.")
+
+            content_type = response.headers.get("Content-Type", "")
+            if "application/json" in content_type:
+                data = content.decode(errors="replace")
+                self.__getLogger("tts").warning(f"Resposta inesperada da API: {data}")
+                raise TTSError("Resposta inválida da API de TTS.")
+
+        return content
+
     @app_commands.command(name="tts", description="Gerar áudio texto-para-voz")
     @app_commands.describe(
         texto="Mensagem a ser falada",
@@ -74,30 +101,13 @@ class TTSCog(commands.Cog):
         try:
 
             # requisitando o áudio
-            url = self.api_url
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-            }
-            payload = {"text": texto}
-
-            response = requests.post(url, headers=headers, json=payload)
-
-            if response.status_code != 200 or not response.content:
+            try:
+                audio_bytes = BytesIO(await self.gerar_audio(texto))
+            except TTSError as e:
                 return await interaction.followup.send(
-                    embed=error_embed("Erro ao gerar o áudio."), ephemeral=ephemeral
+                    embed=error_embed(str(e)), ephemeral=ephemeral
                 )
 
-            content_type = response.headers.get("Content-Type", "")
-            if "application/json" in content_type:
-                data = response.json()
-                logger.warning(f"Resposta inesperada da API: {data}")
-                return await interaction.followup.send(
-                    embed=error_embed("Resposta inválida da API de TTS."),
-                    ephemeral=ephemeral,
-                )
-
-            audio_bytes = BytesIO(response.content)
-
             # convertendo se necessario
             if converter:
                 if not self.FFMPEG_AVAILABLE:
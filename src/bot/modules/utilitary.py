@@ -157,6 +157,28 @@ class Utilitary(commands.Cog):
                 f"❌ Error: {str(e)}", ephemeral=True
             )
 
+    @app_commands.command(
+        name="httpstats",
+        description="Displays latency and status metrics of the bot's outbound requests.",
+    )
+    async def httpstats(self, interaction: discord.Interaction):
+        stats = self.bot.web_client.stats()
+        if not stats:
+            await interaction.response.send_message(
+                "No outbound requests made yet.", ephemeral=True
+            )
+            return
+
+        lines = [
+            f"- `{host}`: {s['requests']} requests, {s['errors']} errors, "
+            f"avg {s['avg_ms']:.0f}ms, max {s['max_ms']:.0f}ms, statuses {s['statuses']}"
+            for host, s in sorted(stats.items())
+        ]
+        content = "🌐 Outbound HTTP:\n" + "\n".join(lines)
+        if len(content) > MAX_DISCORD_MESSAGE_LENGTH:
+            content = content[: MAX_DISCORD_MESSAGE_LENGTH - 15] + "\n...[truncated]"
+        await interaction.response.send_message(content, ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Utilitary(bot))
@@ -1,27 +1,151 @@
+import asyncio
+import bisect
+import functools
+import heapq
+import itertools
+import sys
 import time
+from collections import OrderedDict
+
+
+class SortedKeys:
+    """
+    Sorted list of strings split in blocks of at most 2 * LOAD items, with the last
+    key of every block in `maxes`. Inserting or removing bisects `maxes` and then the
+    block, O(log n) plus a list shift bounded by the block size instead of by n.
+    """
+
+    LOAD = 256
+
+    def __init__(self):
+        self.blocks: list[list[str]] = []
+        self.maxes: list[str] = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key: str):
+        self.size += 1
+        if not self.blocks:
+            self.blocks.append([key])
+            self.maxes.append(key)
+            return
+        i = min(bisect.bisect_left(self.maxes, key), len(self.blocks) - 1)
+        block = self.blocks[i]
+        bisect.insort(block, key)
+        self.maxes[i] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            # divide o bloco: deslocamento O(n / LOAD), raro
+            self.blocks[i : i + 1] = [block[: self.LOAD], block[self.LOAD :]]
+            self.maxes[i : i + 1] = [self.blocks[i][-1], self.blocks[i + 1][-1]]
+
+    def remove(self, key: str):
+        i = bisect.bisect_left(self.maxes, key)
+        block = self.blocks[i]
+        del block[bisect.bisect_left(block, key)]
+        self.size -= 1
+        if block:
+            self.maxes[i] = block[-1]
+        else:
+            del self.blocks[i]
+            del self.maxes[i]
+
+    def startswith(self, prefix: str) -> list[str]:
+        """The keys that start with prefix, in order."""
+        keys = []
+        i = bisect.bisect_left(self.maxes, prefix)
+        while i < len(self.blocks):
+            block = self.blocks[i]
+            for key in block[bisect.bisect_left(block, prefix) :]:
+                if not key.startswith(prefix):
+                    return keys
+                keys.append(key)
+            i += 1
+        return keys
 
 
 class Cache:
-    def __init__(self, ttl=None):
-        self.cache = {}  # key: (data, timestamp, ttl)
+    """
+    In-memory key/value cache with optional TTL, bounded by `max_entries` and/or
+    `max_bytes` (approximate, see `sizeof`) with least recently used eviction.
+
+    Lookups are O(1); writes are O(1) too, plus O(log n) when they schedule an expiry
+    or index a string key (see below). Expired entries
+    are dropped when read and by a background task that sleeps until the next
+    deadline of a min-heap, started on demand whenever an event loop is running.
+    Counters for hits, misses, evictions and expirations are kept in `stats()`.
+
+    String keys are also kept in a sorted index (SortedKeys), so prefix lookups on
+    namespaced keys (`find(startswith=...)`, `delete_prefix`) cost O(log n + k)
+    instead of a full scan.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, max_bytes=None, sizeof=None):
+        self.cache = OrderedDict()  # key: (data, expires_at, size), LRU first
         self.ttl = ttl  # default TTL (global)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._expiry = []  # heap of (expires_at, seq, key), may hold stale items
+        self._seq = itertools.count()
+        self._sweeper = None
+        self._inflight = {}  # key: future of a running get_or_set factory
+        self._keys = SortedKeys()  # string keys, for prefix lookups
+
+    def __len__(self):
+        return len(self.cache)
 
     def get(self, key, fallback=None):
-        if key in self.cache:
-            data, timestamp, ttl = self.cache[key]
-            ttl = ttl if ttl is not None else self.ttl
-            if ttl is None or time.time() - timestamp < ttl:
+        entry = self.cache.get(key)
+        if entry is not None:
+            data, expires_at, _ = entry
+            if expires_at is None or time.monotonic() < expires_at:
+                self.cache.move_to_end(key)
+                self.hits += 1
                 return data
-            else:
-                del self.cache[key]
+            self._remove(key)
+            self._unindex(key)
+            self.expirations += 1
+        self.misses += 1
         return fallback
 
     def set(self, key, data, ttl=None):
-        self.cache[key] = (data, time.time(), ttl)
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(data) if self.max_bytes else 0
+
+        if key in self.cache:
+            self._remove(key)
+        elif isinstance(key, str):
+            self._keys.add(key)
+        self.cache[key] = (data, expires_at, size)
+        self.bytes += size
+
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, next(self._seq), key))
+            self._ensure_sweeper()
+        self._evict()
 
     def delete(self, key):
         if key in self.cache:
-            del self.cache[key]
+            self._remove(key)
+            self._unindex(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Deletes every entry whose key starts with prefix. Returns how many were."""
+        keys = self._keys.startswith(prefix)
+        for key in keys:
+            self._remove(key)
+            self._keys.remove(key)
+        return len(keys)
 
     def find(self, startswith=None, endswith=None, contains=None):
         """
@@ -32,13 +156,17 @@ class Cache:
             - contains: string whose key needs to contain in
         Only returns valid entries (within TTL).
         """
+        if startswith:
+            keys = self._keys.startswith(startswith)
+        else:
+            keys = self.cache
+
+        now = time.monotonic()
         result = {}
-        for k in list(
-            self.cache.keys()
-        ):  # list() evita erro de modificação durante iteração
-            data = self.get(k)  # verifica se ainda está válido (TTL)
-            if data is None:
-                continue
+        for k in keys:
+            data, expires_at, _ = self.cache[k]
+            if expires_at is not None and now >= expires_at:
+                continue  # expirada, o sweeper remove
             if startswith and not k.startswith(startswith):
                 continue
             if endswith and not k.endswith(endswith):
@@ -49,4 +177,216 @@ class Cache:
         return result
 
     def clear(self):
-        self.cache = {}
+        self.cache = OrderedDict()
+        self.bytes = 0
+        self._expiry = []
+        self._keys = SortedKeys()
+
+    async def get_or_set(self, key, factory, ttl=None):
+        """
+        Returns the cached value for key, or awaits `factory()` to produce and cache it.
+        Concurrent callers for the same missing key share a single factory call, run
+        in its own task: a cancelled caller stops waiting without cancelling it for
+        the others. Exceptions are propagated to every waiter and nothing is cached.
+        """
+        sentinel = object()
+        data = self.get(key, sentinel)
+        if data is not sentinel:
+            return data
+
+        task = self._inflight.get(key)
+        if task is None:
+
+            async def fill():
+                try:
+                    data = await factory()
+                    self.set(key, data, ttl)
+                    return data
+                finally:
+                    del self._inflight[key]
+
+            task = self._inflight[key] = _start_shared(fill())
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Stops the background sweeper (restarted on the next set with a TTL)."""
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    # internals
+
+    def _remove(self, key):
+        _, _, size = self.cache.pop(key)
+        self.bytes -= size
+
+    def _unindex(self, key):
+        if isinstance(key, str):
+            self._keys.remove(key)
+
+    def _evict(self):
+        while self.cache and (
+            (self.max_entries and len(self.cache) > self.max_entries)
+            or (self.max_bytes and self.bytes > self.max_bytes)
+        ):
+            key = next(iter(self.cache))
+            self._remove(key)
+            self._unindex(key)
+            self.evictions += 1
+
+    def _expire(self):
+        """Drops every entry whose deadline has passed. Returns the next deadline."""
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._expiry)
+            entry = self.cache.get(key)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self._unindex(key)
+                self.expirations += 1
+
+        # itens obsoletos (chave sobrescrita/removida) só saem quando vencem,
+        # então o heap é reconstruído se crescer demais em relação ao cache
+        if len(self._expiry) > 2 * len(self.cache) + 64:
+            self._expiry = [
+                (expires_at, next(self._seq), key)
+                for key, (_, expires_at, _) in self.cache.items()
+                if expires_at is not None
+            ]
+            heapq.heapify(self._expiry)
+        return self._expiry[0][0] if self._expiry else None
+
+    def _ensure_sweeper(self):
+        if self._sweeper and not self._sweeper.done():
+            return
+        try:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+        except RuntimeError:
+            pass  # sem event loop: expiração continua acontecendo na leitura
+
+    async def _sweep(self):
+        while True:
+            deadline = self._expire()
+            if deadline is None:
+                return
+            await asyncio.sleep(max(deadline - time.monotonic(), 0))
+
+
+_cached_functions = {}  # qualified name: wrapper, for async_cached_stats()
+
+
+def _start_shared(coro) -> asyncio.Task:
+    """Runs a single-flight call in its own task, awaited through asyncio.shield."""
+    task = asyncio.ensure_future(coro)
+    # recupera a exceção mesmo se todos que esperavam foram cancelados
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+def _default_key(*args, **kwargs):
+    return (args, tuple(sorted(kwargs.items()))) if kwargs else args
+
+
+def async_cached(
+    ttl=None,
+    key=None,
+    negative_ttl=None,
+    is_negative=None,
+    max_entries=None,
+    max_bytes=None,
+):
+    """
+    Memoizes an async function (or method) in a Cache.
+
+    - ttl: how long a result is reused (None: until evicted)
+    - key: builds the cache key from the call arguments (`self` included for methods),
+      defaults to the arguments themselves, which must then be hashable
+    - negative_ttl: how long negative results are reused, None to never cache them
+    - is_negative: tells negative results apart (default: result is None)
+    - max_entries / max_bytes: bounds of the underlying Cache
+
+    Concurrent calls with the same key while one is running await that same call
+    (single-flight), which runs in its own task so cancelling one caller does not
+    cancel it for the others. Exceptions are propagated to all of them and never
+    cached.
+    The wrapper exposes `cache`, `cache_info()` and `cache_clear()`.
+    """
+    key = key or _default_key
+    is_negative = is_negative or (lambda result: result is None)
+
+    def decorator(func):
+        cache = Cache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        inflight = {}
+        info = {"hits": 0, "misses": 0, "coalesced": 0, "negative": 0, "errors": 0}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            sentinel = object()
+            result = cache.get(k, sentinel)
+            if result is not sentinel:
+                info["hits"] += 1
+                return result
+
+            task = inflight.get(k)
+            if task is not None:
+                info["coalesced"] += 1
+                return await asyncio.shield(task)
+
+            async def call():
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    info["errors"] += 1
+                    raise
+                finally:
+                    del inflight[k]
+                if not is_negative(result):
+                    cache.set(k, result)
+                else:
+                    info["negative"] += 1
+                    if negative_ttl is not None:
+                        cache.set(k, result, negative_ttl)
+                return result
+
+            info["misses"] += 1
+            task = inflight[k] = _start_shared(call())
+            return await asyncio.shield(task)
+
+        def cache_info() -> dict:
+            calls = info["hits"] + info["misses"] + info["coalesced"]
+            return {
+                **info,
+                "entries": len(cache),
+                "hit_rate": (
+                    (info["hits"] + info["coalesced"]) / calls if calls else 0.0
+                ),
+            }
+
+        def cache_clear():
+            cache.clear()
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        _cached_functions[func.__qualname__] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def async_cached_stats() -> dict:
+    """Returns cache_info() of every @async_cached function, by qualified name."""
+    return {name: func.cache_info() for name, func in _cached_functions.items()}
@@ -1,6 +1,7 @@
 import logging
 import os
 
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 
 logger = logging.getLogger("bot.database")
@@ -24,3 +25,33 @@ class DatabaseClient:
 
     def get_collection(self, collection_name):
         return self.database[collection_name]
+
+
+class AsyncDatabaseClient:
+    """
+    Non-blocking counterpart of DatabaseClient, backed by motor.
+    Collections returned here must be awaited (find_one, update_one, ...)
+    and iterated with `async for`, so DB latency never blocks the gateway loop.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+            cls._instance.client = AsyncIOMotorClient(os.getenv("DATABASE_URI"))
+            cls._instance.database = cls._instance.client[os.getenv("DATABASE_NAME")]
+        return cls._instance
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.client.close()
+        AsyncDatabaseClient._instance = None
+
+    def get_collection(self, collection_name):
+        return self.database[collection_name]
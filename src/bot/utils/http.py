@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger("bot.http")
+
+
+class HostStats:
+    """Latency and status counters of the requests made to one host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.statuses = Counter()
+
+    def record(self, elapsed: float, status: Optional[int] = None):
+        self.requests += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if status is None:
+            self.errors += 1
+        else:
+            self.statuses[status] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": 1000 * self.total_time / self.requests if self.requests else 0.0,
+            "max_ms": 1000 * self.max_time,
+            "statuses": dict(self.statuses),
+        }
+
+
+class HttpClient:
+    """
+    The bot's outbound HTTP client: a single aiohttp session shared by every module
+    (`bot.web_client`) so connections are kept alive and reused between calls.
+
+    Pool size, per-host limit, DNS cache TTL and default timeouts come from env
+    (HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_TTL, HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT). The default total timeout is 30s (aiohttp's is 300s) and
+    covers reading the body too, so slow or streamed calls must pass their own.
+    Every request is timed and counted per host, see stats().
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        dns_ttl: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+    ):
+        self.limit = (
+            limit if limit is not None else int(os.getenv("HTTP_POOL_LIMIT", "100"))
+        )
+        self.limit_per_host = (
+            limit_per_host
+            if limit_per_host is not None
+            else int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+        )
+        self.dns_ttl = (
+            dns_ttl if dns_ttl is not None else int(os.getenv("HTTP_DNS_TTL", "300"))
+        )
+        self.timeout = aiohttp.ClientTimeout(
+            total=(
+                timeout
+                if timeout is not None
+                else float(os.getenv("HTTP_TIMEOUT", "30"))
+            ),
+            connect=(
+                connect_timeout
+                if connect_timeout is not None
+                else float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+            ),
+        )
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.hosts = defaultdict(HostStats)
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout
+            )
+            logger.debug(
+                f"HTTP pool started (limit={self.limit}, per host={self.limit_per_host})"
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self, method: str, url: str, *, timeout: Optional[float] = None, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Like ClientSession.request, used as `async with client.request(...) as resp`.
+        `timeout` is the total seconds allowed for this request (default from env).
+        """
+        if self.session is None or self.session.closed:
+            await self.start()
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(
+                total=timeout, connect=self.timeout.connect
+            )
+
+        stats = self.hosts[urlsplit(url).netloc]
+        start = time.monotonic()
+        recorded = False
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                # latência até os headers, o corpo é lido por quem chamou
+                stats.record(time.monotonic() - start, response.status)
+                recorded = True
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if not recorded:
+                stats.record(time.monotonic() - start)
+            raise
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Per host request metrics: count, errors, avg/max latency and status codes."""
+        return {host: stats.as_dict() for host, stats in self.hosts.items()}
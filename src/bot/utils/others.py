@@ -1,5 +1,20 @@
+import re
+import unicodedata
+
+
 def print_methods(thing):
     # iterate over thing and show all methods:
     for method in dir(thing):
         if callable(getattr(thing, method)):
             print(method)
+
+
+def fold_text(text: str) -> str:
+    """
+    Folds text for comparisons: no accents, lowercase, punctuation as spaces and
+    whitespace collapsed ("  Olá,  Mundo! " -> "ola mundo").
+    """
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
@@ -0,0 +1,121 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger("bot.ratelimit")
+
+_limiters = {}  # name: RateLimiter, for rate_limit_stats()
+
+# interaction -> key of the bucket it consumes from
+SCOPES: dict[str, Callable[[discord.Interaction], Hashable]] = {
+    "user": lambda interaction: interaction.user.id,
+    "guild": lambda interaction: interaction.guild_id or interaction.user.id,
+    "channel": lambda interaction: interaction.channel_id,
+    "global": lambda interaction: None,
+}
+
+
+class RateLimiter:
+    """
+    Token bucket limiter, implemented as GCRA: each key may make `rate` calls per
+    `per` seconds, in bursts of up to `burst` calls (default `rate`). The whole state
+    of a key is one timestamp (when its bucket is full again); keys whose bucket
+    refilled are forgotten, and at most `max_keys` are kept, least recently used
+    dropped first.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        per: float,
+        burst: Optional[int] = None,
+        max_keys: int = 10000,
+        name: Optional[str] = None,
+    ):
+        self.rate = rate
+        self.per = per
+        self.interval = per / rate
+        self.burst = burst or rate
+        self.max_keys = max_keys
+        self._full_at = OrderedDict()  # key: when its bucket is full again
+        self.allowed = 0
+        self.throttled = 0
+        if name:
+            _limiters[name] = self
+
+    def hit(self, key: Hashable = None) -> float:
+        """
+        Takes a token from key's bucket. Returns 0 if the call is allowed, otherwise
+        the seconds until it would be (and nothing is taken).
+        """
+        now = time.monotonic()
+        full_at = max(self._full_at.get(key, now), now)
+        retry_after = full_at - now - (self.burst - 1) * self.interval
+        if retry_after > 0:
+            self.throttled += 1
+            return retry_after
+
+        self._full_at[key] = full_at + self.interval
+        self._full_at.move_to_end(key)
+        self.allowed += 1
+        self._prune(now)
+        return 0.0
+
+    def reset(self, key: Hashable = None):
+        self._full_at.pop(key, None)
+
+    def _prune(self, now: float):
+        # the least recently used first: refilled ones are the same as unknown keys
+        while self._full_at:
+            key, full_at = next(iter(self._full_at.items()))
+            if full_at > now and len(self._full_at) <= self.max_keys:
+                break
+            del self._full_at[key]
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+            "keys": len(self._full_at),
+        }
+
+
+def rate_limit(
+    rate: int,
+    per: float,
+    scope: str = "user",
+    burst: Optional[int] = None,
+    max_keys: int = 10000,
+):
+    """
+    App command check: allows `rate` uses per `per` seconds for each user, guild,
+    channel or globally (`scope`). Throttled uses raise CommandOnCooldown, answered by
+    the bot's on_tree_error.
+    """
+    key = SCOPES[scope]
+
+    def decorator(func):
+        name = getattr(func, "callback", func).__qualname__
+        limiter = RateLimiter(rate, per, burst=burst, max_keys=max_keys, name=name)
+
+        def predicate(interaction: discord.Interaction) -> bool:
+            retry_after = limiter.hit(key(interaction))
+            if retry_after:
+                logger.debug(f"{name} throttled for {interaction.user.id}")
+                raise app_commands.CommandOnCooldown(
+                    app_commands.Cooldown(rate, per), retry_after
+                )
+            return True
+
+        return app_commands.check(predicate)(func)
+
+    return decorator
+
+
+def rate_limit_stats() -> dict:
+    """Returns stats() of every named limiter (and @rate_limit command)."""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("bot.resilience")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service for a while. After `failure_threshold` failures
+    in a row the circuit opens and calls fail fast with CircuitOpen; `reset_timeout`
+    seconds later it becomes half-open and lets a single probe call through, which
+    closes it again on success or reopens it on failure.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0  # falhas seguidas
+        self.opened_at = 0.0
+        self.total_failures = 0
+        self.rejected = 0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        self._acquire()
+        probe = self.state == HALF_OPEN
+        try:
+            result = await func()
+        except Exception:
+            self._on_failure()
+            raise
+        except BaseException:
+            if probe:
+                self._probing = False  # cancelada: não conta como falha nem sucesso
+            raise
+        self._on_success()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state == OPEN else 0.0,
+        }
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit {self.name}: {self.state} -> {state}")
+            self.state = state
+
+    def _acquire(self):
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.retry_after())
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.reset_timeout)
+            self._probing = True
+
+    def _on_success(self):
+        self.failures = 0
+        self._probing = False
+        self._set_state(CLOSED)
+
+    def _on_failure(self):
+        self.failures += 1
+        self.total_failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+
+def full_jitter(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Backoff before retry number `attempt` (1-based): uniform in [0, base * 2^(attempt-1)]."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class LatencyTracker:
+    """Latencies of the last `window` successful calls, for percentiles."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, elapsed: float):
+        self.samples.append(elapsed)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile (0-100), or None until min_samples were recorded."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def hedged(func: Callable[[int], Awaitable[Any]], delay: Optional[float]) -> Any:
+    """
+    Awaits func(0); if it has not finished after `delay` seconds, also starts func(1)
+    and returns whichever succeeds first, cancelling the other. Fails only when both
+    fail (with the last error). delay=None disables the hedge.
+    """
+    if delay is None:
+        return await func(0)
+
+    tasks = [asyncio.ensure_future(func(0))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.append(asyncio.ensure_future(func(1)))
+
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class QueueFull(Exception):
+    """Raised by FairScheduler.run when the caller's queue is at its depth limit."""
+
+    def __init__(self, key: Hashable):
+        super().__init__(f"queue for {key} is full")
+        self.key = key
+
+
+class TimingStats:
+    """Count, average and max of a duration, in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class FairScheduler:
+    """
+    Runs coroutines with at most `concurrency` of them at a time. Callers that have to
+    wait are queued per key (e.g. guild) and served round-robin across keys, so a burst
+    from one key does not starve the others. Each key queues at most `max_queue` calls.
+
+    Wait time (queued until started) and service time (started until done) are kept
+    apart in stats().
+    """
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self.queues: OrderedDict[Hashable, deque[asyncio.Future]] = OrderedDict()
+        self.rejected = 0
+        self.wait = TimingStats()
+        self.service = TimingStats()
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def position(self, key: Hashable, index: int) -> int:
+        """Estimated overall position (1-based) of the index-th waiter of key."""
+        turns = index + 1
+        return turns + sum(
+            min(len(queue), turns) for k, queue in self.queues.items() if k != key
+        )
+
+    async def run(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        on_queued: Optional[Callable[[int], Awaitable]] = None,
+    ) -> Any:
+        """
+        Awaits func() once a slot is free and it is key's turn. If it has to wait,
+        on_queued(position) is awaited first. Raises QueueFull if key's queue is full.
+        """
+        enqueued_at = time.monotonic()
+
+        if self.running < self.concurrency and not self.queues:
+            self.running += 1
+        else:
+            queue = self.queues.get(key)
+            if queue is not None and len(queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(key)
+
+            future = asyncio.get_running_loop().create_future()
+            queue = self.queues.setdefault(key, deque())
+            queue.append(future)
+            try:
+                if on_queued:
+                    await on_queued(self.position(key, len(queue) - 1))
+                await future
+            except BaseException:
+                if future.done() and not future.cancelled():
+                    self._release()  # o slot já tinha sido passado pra cá
+                else:
+                    future.cancel()
+                    self._discard(key, future)
+                raise
+
+        started_at = time.monotonic()
+        self.wait.record(started_at - enqueued_at)
+        try:
+            return await func()
+        finally:
+            self.service.record(time.monotonic() - started_at)
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queued(),
+            "queued_keys": len(self.queues),
+            "rejected": self.rejected,
+            "wait": self.wait.as_dict(),
+            "service": self.service.as_dict(),
+        }
+
+    def _discard(self, key: Hashable, future: asyncio.Future):
+        queue = self.queues.get(key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self.queues[key]
+
+    def _release(self):
+        """Hands the freed slot to the next key in turn, or frees it."""
+        while self.queues:
+            key, queue = next(iter(self.queues.items()))
+            future = queue.popleft()
+            if queue:
+                self.queues.move_to_end(key)
+            else:
+                del self.queues[key]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
@@ -0,0 +1,65 @@
+import hashlib
+import logging
+import os
+import pickle
+import zlib
+from typing import Any, Optional
+
+logger = logging.getLogger("bot.snapshot")
+
+# file layout: MAGIC | version (1 byte) | sha256 of the payload | zlib(pickle(data))
+MAGIC = b"VXSNAP"
+VERSION = 1
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def freeze(data: Any) -> bytes:
+    """
+    Pickles data. Cheap compared to compressing and writing, so it can run on the
+    event loop and capture a consistent state while the rest runs in a thread.
+    """
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def dump_snapshot(frozen: bytes) -> bytes:
+    """Frames frozen data into the snapshot format (compressed, versioned, checksummed)."""
+    payload = zlib.compress(frozen)
+    return MAGIC + bytes([VERSION]) + hashlib.sha256(payload).digest() + payload
+
+
+def load_snapshot(raw: bytes) -> Any:
+    """Inverse of dump_snapshot. Raises ValueError if the data is not a valid snapshot."""
+    header_size = len(MAGIC) + 1
+    if raw[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a snapshot file")
+    if raw[len(MAGIC)] != VERSION:
+        raise ValueError(f"unsupported snapshot version {raw[len(MAGIC)]}")
+
+    digest = raw[header_size : header_size + DIGEST_SIZE]
+    payload = raw[header_size + DIGEST_SIZE :]
+    if hashlib.sha256(payload).digest() != digest:
+        raise ValueError("snapshot checksum mismatch")
+    return pickle.loads(zlib.decompress(payload))
+
+
+def write_snapshot(path: str, frozen: bytes):
+    """Atomically writes a snapshot file (a crash never leaves a half-written file)."""
+    raw = dump_snapshot(frozen)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[Any]:
+    """Reads a snapshot file, returning None if it is missing or invalid."""
+    try:
+        with open(path, "rb") as f:
+            return load_snapshot(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring invalid snapshot {path}: {e}")
+        return None
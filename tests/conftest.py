@@ -0,0 +1,13 @@
+import logging
+import os
+import sys
+from functools import partialmethod
+
+# the tests import the bot's packages (src.bot...) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# custom level the core modules log with, normally added by src.bot.utils.logging
+# (which also opens logs/debug.log, not wanted here)
+logging.TRACE = 5
+logging.addLevelName(logging.TRACE, "TRACE")
+logging.Logger.trace = partialmethod(logging.Logger.log, logging.TRACE)
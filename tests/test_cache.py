@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from src.bot.utils.cache import Cache, SortedKeys, async_cached
+
+
+def test_get_set_and_fallback():
+    cache = Cache()
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b", "fallback") == "fallback"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_expires_on_read(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = Cache(ttl=10)
+    cache.set("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = Cache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # b is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_or_set_runs_the_factory_once():
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main():
+        cache = Cache()
+        results = await asyncio.gather(
+            *(cache.get_or_set("k", factory) for _ in range(5))
+        )
+        assert results == [42] * 5
+        assert await cache.get_or_set("k", factory) == 42
+
+    asyncio.run(main())
+    assert calls == 1
+
+
+def test_get_or_set_survives_a_cancelled_caller():
+    async def factory():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def main():
+        cache = Cache()
+        first = asyncio.create_task(cache.get_or_set("k", factory))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_set("k", factory))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == 42
+        assert cache.get("k") == 42
+
+    asyncio.run(main())
+
+
+def test_get_or_set_does_not_cache_errors():
+    async def failing():
+        raise ValueError("boom")
+
+    async def main():
+        cache = Cache()
+        with pytest.raises(ValueError):
+            await cache.get_or_set("k", failing)
+        assert cache.get("k") is None
+
+    asyncio.run(main())
+
+
+def test_prefix_lookups():
+    cache = Cache()
+    for key in ("1:a", "1:b", "10:a", "2:a"):
+        cache.set(key, key)
+    cache.set(1, "not a string")
+
+    assert cache.find(startswith="1:") == {"1:a": "1:a", "1:b": "1:b"}
+    assert cache.delete_prefix("1:") == 2
+    assert cache.get("1:a") is None
+    assert cache.get("10:a") == "10:a"
+    assert cache.get(1) == "not a string"
+
+
+def test_prefix_index_follows_evictions():
+    cache = Cache(max_entries=3)
+    for i in range(5):
+        cache.set(f"k:{i}", i)
+    assert sorted(cache.find(startswith="k:")) == ["k:2", "k:3", "k:4"]
+    cache.delete("k:3")
+    assert cache.delete_prefix("k:") == 2
+    assert len(cache) == 0
+
+
+def test_sorted_keys_matches_a_sorted_list():
+    rng = random.Random(0)
+    index, expected = SortedKeys(), []
+    index.LOAD = 4  # small blocks so splits and empty blocks happen
+    for _ in range(2000):
+        key = f"{rng.randrange(5)}:{rng.randrange(200)}"
+        if key in expected and rng.random() < 0.5:
+            index.remove(key)
+            expected.remove(key)
+        elif key not in expected:
+            index.add(key)
+            expected.append(key)
+    expected.sort()
+
+    assert len(index) == len(expected)
+    for prefix in ("", "1:", "3:1", "9:"):
+        assert index.startswith(prefix) == [k for k in expected if k.startswith(prefix)]
+
+
+def test_async_cached_coalesces_and_caches_negatives():
+    calls = []
+
+    @async_cached(ttl=60, negative_ttl=60)
+    async def lookup(n):
+        calls.append(n)
+        await asyncio.sleep(0.01)
+        return None if n < 0 else n * 2
+
+    async def main():
+        assert await asyncio.gather(lookup(1), lookup(1), lookup(-1)) == [2, 2, None]
+        assert await lookup(1) == 2
+        assert await lookup(-1) is None
+
+    asyncio.run(main())
+    assert sorted(calls) == [-1, 1]
+    info = lookup.cache_info()
+    assert info["coalesced"] == 1
+    assert info["negative"] == 1
@@ -0,0 +1,71 @@
+import asyncio
+import uuid
+
+import pytest
+
+import src.bot.core.GuildDataBackend as backends
+
+
+def test_apply_update_operators():
+    doc = {"A": {"b": 1}, "L": [1, 2]}
+    backends.apply_update(doc, {"$set": {"A.c": 2, "N.x": 3}})
+    backends.apply_update(doc, {"$unset": {"A.b": "", "missing.path": ""}})
+    backends.apply_update(
+        doc, {"$addToSet": {"L": {"$each": [2, 3]}, "M": {"$each": [1]}}}
+    )
+    backends.apply_update(doc, {"$pull": {"L": {"$in": [1]}}})
+    assert doc == {"A": {"c": 2}, "N": {"x": 3}, "L": [2, 3], "M": [1]}
+
+
+def test_apply_update_replaces_non_dict_parents():
+    doc = {"A": 1}
+    backends.apply_update(doc, {"$set": {"A.b": 2}})
+    assert doc == {"A": {"b": 2}}
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        backends.GuildDataBackend()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    name = f"test-{uuid.uuid4()}"
+    if request.param == "memory":
+        storage = backends.MemoryBackend(name)
+    else:
+        storage = backends.SQLiteBackend(str(tmp_path / "gdm.sqlite3"), name)
+    yield storage
+    asyncio.run(storage.close())
+
+
+async def load_all(backend) -> dict:
+    return {doc["GUILD_ID"]: doc async for doc in backend.load_all()}
+
+
+def test_backend_round_trip(backend):
+    async def main():
+        await backend.apply(
+            [
+                (1, {"$set": {"PREFIX": "!", "TEMP.10": {"owner": 5}}}),
+                (2, {"$addToSet": {"IDS": {"$each": [7, 8]}}}),
+                (1, {"$set": {"TEMP.11": {"owner": 6}}}),
+                (2, {"$pull": {"IDS": {"$in": [7]}}}),
+                (1, {"$unset": {"TEMP.10": ""}}),
+            ]
+        )
+        docs = await load_all(backend)
+        assert docs[1] == {"GUILD_ID": 1, "PREFIX": "!", "TEMP": {"11": {"owner": 6}}}
+        assert docs[2] == {"GUILD_ID": 2, "IDS": [8]}
+        assert await backend.load_many([2, 3]) == {2: docs[2]}
+
+    asyncio.run(main())
+
+
+def test_backend_unset_removes_key(backend):
+    async def main():
+        await backend.apply([(1, {"$set": {"A": 1, "B": 2}})])
+        await backend.apply([(1, {"$unset": {"A": ""}})])
+        assert (await backend.load_many([1]))[1] == {"GUILD_ID": 1, "B": 2}
+
+    asyncio.run(main())
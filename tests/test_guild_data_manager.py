@@ -0,0 +1,223 @@
+import asyncio
+import sqlite3
+import uuid
+
+import pytest
+
+import src.bot.core.GuildDataBackend as backends
+from src.bot.core.GuildDataManager import GuildDataManager, _merge_update
+
+
+def make_gdm(storage, **kwargs) -> GuildDataManager:
+    options = dict(
+        watch=False, preload="all", max_guilds=0, idle_ttl=0, snapshot_dir=""
+    )
+    options.update(kwargs)
+    return GuildDataManager(storage, module_name="test", **options)
+
+
+def memory() -> backends.MemoryBackend:
+    return backends.MemoryBackend(f"test-{uuid.uuid4()}")
+
+
+class SlowBackend(backends.MemoryBackend):
+    async def apply(self, updates):
+        await asyncio.sleep(0.05)
+        await super().apply(updates)
+
+
+def test_merge_update_coalesces_same_path():
+    pending = []
+    _merge_update(pending, "$set", "A", 1)
+    _merge_update(pending, "$set", "B", 2)
+    _merge_update(pending, "$set", "A", 3)
+    _merge_update(pending, "$unset", "B", "")
+    assert pending == [{"$set": {"A": 3}, "$unset": {"B": ""}}]
+
+
+def test_merge_update_merges_array_operators():
+    pending = []
+    _merge_update(pending, "$addToSet", "L", {"$each": [1, 2]})
+    _merge_update(pending, "$addToSet", "L", {"$each": [2, 3]})
+    assert pending == [{"$addToSet": {"L": {"$each": [1, 2, 3]}}}]
+
+
+def test_merge_update_splits_conflicting_paths():
+    pending = []
+    _merge_update(pending, "$set", "A.b", 1)
+    _merge_update(pending, "$set", "A", {"c": 2})
+    _merge_update(pending, "$addToSet", "A.c", {"$each": [1]})
+    # applied in order, so replaying them gives the same document
+    assert pending == [
+        {"$set": {"A.b": 1}},
+        {"$set": {"A": {"c": 2}}},
+        {"$addToSet": {"A.c": {"$each": [1]}}},
+    ]
+
+
+def test_writes_are_visible_and_stored():
+    storage = memory()
+
+    async def main():
+        gdm = make_gdm(storage)
+        await gdm.load()
+        await gdm.set(1, "PREFIX", "!")
+        await gdm.set_path(1, "TEMP.10", {"owner": 5})
+        await gdm.add_to_set(1, "IDS", 7, 8)
+        await gdm.pull(1, "IDS", 7)
+        assert await gdm.get(1, "PREFIX") == "!"
+        assert await gdm.get(1, "IDS") == [8]
+        assert await gdm.get(2, "PREFIX", "?") == "?"
+        await gdm.close()
+
+    asyncio.run(main())
+    assert storage.docs[1] == {
+        "GUILD_ID": 1,
+        "PREFIX": "!",
+        "TEMP": {"10": {"owner": 5}},
+        "IDS": [8],
+    }
+
+
+def test_write_behind_flushes_coalesced_updates():
+    storage = memory()
+    applied = []
+    apply = storage.apply
+
+    async def recording_apply(updates):
+        applied.append(list(updates))
+        await apply(updates)
+
+    storage.apply = recording_apply
+
+    async def main():
+        gdm = make_gdm(storage, write_behind=True, flush_interval=60)
+        await gdm.load()
+        for value in range(10):
+            await gdm.set(1, "COUNTER", value)
+        assert storage.docs == {}
+        assert await gdm.get(1, "COUNTER") == 9
+        await gdm.close()
+
+    asyncio.run(main())
+    assert applied == [[(1, {"$set": {"COUNTER": 9}})]]
+    assert storage.docs[1]["COUNTER"] == 9
+
+
+def test_close_keeps_a_batch_cancelled_mid_flush():
+    storage = SlowBackend(f"test-{uuid.uuid4()}")
+
+    async def main():
+        gdm = make_gdm(storage, write_behind=True, flush_interval=0.01)
+        await gdm.load()
+        await gdm.set(1, "A", 1)
+        await asyncio.sleep(0.03)  # the flush loop is writing A
+        await gdm.set(1, "B", 2)
+        await gdm.close()
+
+    asyncio.run(main())
+    assert storage.docs[1] == {"GUILD_ID": 1, "A": 1, "B": 2}
+
+
+def test_lazy_load_batches_misses():
+    storage = memory()
+    storage.docs.update({gid: {"GUILD_ID": gid, "N": gid} for gid in range(5)})
+    calls = []
+    load_many = storage.load_many
+
+    async def recording_load_many(guild_ids):
+        calls.append(sorted(guild_ids))
+        return await load_many(guild_ids)
+
+    storage.load_many = recording_load_many
+
+    async def main():
+        gdm = make_gdm(storage, preload="none")
+        await gdm.load()
+        values = await asyncio.gather(*(gdm.get(gid, "N") for gid in range(7)))
+        assert values == [0, 1, 2, 3, 4, None, None]
+        assert await gdm.get(6, "N") is None  # remembered as absent
+        await gdm.set(6, "N", 6)
+        assert await gdm.get(6, "N") == 6
+        await gdm.close()
+
+    asyncio.run(main())
+    assert calls == [list(range(7))]
+
+
+def test_sqlite_backend_persists_across_restarts(tmp_path):
+    path = str(tmp_path / "gdm.sqlite3")
+
+    async def main():
+        gdm = make_gdm(backends.SQLiteBackend(path, "module-test"))
+        await gdm.load()
+        await gdm.set_path(1, "TEMP.10", {"owner": 5})
+        await gdm.set(2, "PREFIX", "!")
+        await gdm.close()
+
+        gdm = make_gdm(backends.SQLiteBackend(path, "module-test"))
+        await gdm.load()
+        assert await gdm.get(1, "TEMP") == {"10": {"owner": 5}}
+        assert await gdm.get(2, "PREFIX") == "!"
+        await gdm.close()
+
+    asyncio.run(main())
+
+
+class FailingBackend(backends.MemoryBackend):
+    async def apply(self, updates):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_failed_write_is_not_cached():
+    storage = FailingBackend(f"test-{uuid.uuid4()}")
+
+    async def main():
+        gdm = make_gdm(storage)
+        await gdm.load()
+        with pytest.raises(sqlite3.OperationalError):
+            await gdm.add_to_set(1, "ID_JTC_CHANNELS", 42)
+        assert await gdm.get(1, "ID_JTC_CHANNELS") is None
+        await gdm.close()
+
+    asyncio.run(main())
+
+
+def test_polled_document_survives_eviction():
+    storage = memory()
+
+    async def main():
+        gdm = make_gdm(
+            storage, preload="none", watch=True, poll_interval=0.01, max_guilds=1
+        )
+        await gdm.load()
+        assert await gdm.get(5, "K") is None  # remembered as absent
+        storage.docs[5] = {"GUILD_ID": 5, "K": "v"}  # written by another process
+        await asyncio.sleep(0.05)
+        assert await gdm.get(5, "K") == "v"
+        await gdm.get(6, "K")  # evicts guild 5
+        assert await gdm.get(5, "K") == "v"
+        await gdm.close()
+
+    asyncio.run(main())
+
+
+def test_snapshot_does_not_restore_absent_guilds(tmp_path):
+    storage = memory()
+    options = dict(preload="guilds", max_guilds=1, snapshot_dir=str(tmp_path))
+
+    async def main():
+        gdm = make_gdm(storage, **options)
+        await gdm.load([])
+        assert await gdm.get(5, "K") is None
+        assert await gdm.get(6, "K") is None  # evicts guild 5
+        await gdm.close()
+
+        storage.docs[5] = {"GUILD_ID": 5, "K": "v"}  # configured while down
+
+        gdm = make_gdm(storage, **options)
+        await gdm.load([])
+        assert await gdm.get(5, "K") == "v"
+        await gdm.close()
+
+    asyncio.run(main())
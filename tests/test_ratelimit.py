@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from src.bot.utils.ratelimit import RateLimiter, rate_limit_stats
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_rate_per_key(clock):
+    limiter = RateLimiter(1, 10)
+    assert limiter.hit("a") == 0
+    assert limiter.hit("a") == pytest.approx(10)
+    assert limiter.hit("b") == 0  # keys don't share a bucket
+    clock[0] += 4
+    assert limiter.hit("a") == pytest.approx(6)
+    clock[0] += 6
+    assert limiter.hit("a") == 0
+    # b's bucket refilled meanwhile, so it is no longer tracked
+    assert limiter.stats() == {"allowed": 3, "throttled": 2, "keys": 1}
+
+
+def test_burst_refills_one_token_per_interval(clock):
+    limiter = RateLimiter(1, 10, burst=3)
+    assert [limiter.hit() for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit() == pytest.approx(10)
+    clock[0] += 10
+    assert limiter.hit() == 0
+    assert limiter.hit() > 0
+
+
+def test_refilled_and_excess_keys_are_forgotten(clock):
+    limiter = RateLimiter(1, 10, max_keys=2)
+    for key in "abc":
+        limiter.hit(key)
+    assert limiter.stats()["keys"] == 2  # least recently used dropped
+    clock[0] += 11
+    limiter.hit("d")
+    assert limiter.stats()["keys"] == 1
+
+
+def test_reset_and_named_stats(clock):
+    limiter = RateLimiter(1, 60, name="tests.reset")
+    limiter.hit("a")
+    limiter.reset("a")
+    assert limiter.hit("a") == 0
+    assert rate_limit_stats()["tests.reset"]["allowed"] == 2
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from src.bot.utils import resilience
+
+
+async def fail():
+    raise ValueError("boom")
+
+
+async def succeed():
+    return "ok"
+
+
+def test_circuit_opens_after_threshold_and_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = resilience.CircuitBreaker("svc", failure_threshold=2, reset_timeout=30)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await breaker.call(fail)
+        assert breaker.state == resilience.OPEN
+        with pytest.raises(resilience.CircuitOpen):
+            await breaker.call(succeed)
+
+        now[0] += 31  # half-open: one probe goes through
+        assert await breaker.call(succeed) == "ok"
+        assert breaker.state == resilience.CLOSED
+        assert breaker.stats()["rejected"] == 1
+
+    asyncio.run(main())
+
+
+def test_failed_probe_reopens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = resilience.CircuitBreaker("svc", failure_threshold=1, reset_timeout=10)
+
+    async def main():
+        with pytest.raises(ValueError):
+            await breaker.call(fail)
+        now[0] += 11
+        with pytest.raises(ValueError):
+            await breaker.call(fail)
+        assert breaker.state == resilience.OPEN
+        assert breaker.retry_after() == 10
+
+    asyncio.run(main())
+
+
+def test_full_jitter_bounds():
+    for attempt in range(1, 10):
+        delay = resilience.full_jitter(attempt, base=1, cap=30)
+        assert 0 <= delay <= min(30, 2 ** (attempt - 1))
+
+
+def test_latency_percentile():
+    tracker = resilience.LatencyTracker(window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i)
+    assert tracker.percentile(50) is None
+    for i in range(9, 100):
+        tracker.record(i)
+    assert tracker.percentile(50) == 50
+    assert tracker.percentile(95) == 95
+
+
+def test_hedged_returns_the_first_success():
+    started = []
+
+    async def request(i):
+        started.append(i)
+        await asyncio.sleep(0.2 if i == 0 else 0.01)
+        return i
+
+    assert asyncio.run(resilience.hedged(request, 0.02)) == 1
+    assert started == [0, 1]
+
+
+def test_hedged_without_delay_makes_one_call():
+    async def request(i):
+        return i
+
+    assert asyncio.run(resilience.hedged(request, None)) == 0
+
+
+def test_hedged_fails_only_when_both_fail():
+    async def request(i):
+        await asyncio.sleep(0.05 if i == 0 else 0)
+        if i == 0:
+            return "slow but fine"
+        raise ValueError("hedge failed")
+
+    assert asyncio.run(resilience.hedged(request, 0.01)) == "slow but fine"
+
+    async def failing(i):
+        await asyncio.sleep(0.02)
+        raise ValueError(str(i))
+
+    with pytest.raises(ValueError):
+        asyncio.run(resilience.hedged(failing, 0.01))
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src.bot.utils.scheduler import FairScheduler, QueueFull
+
+
+def test_concurrency_limit_and_round_robin():
+    order = []
+
+    async def main():
+        scheduler = FairScheduler(concurrency=1, max_queue=10)
+        gate = asyncio.Event()
+
+        async def job(name):
+            if name == "first":
+                await gate.wait()
+            order.append(name)
+
+        tasks = [asyncio.create_task(scheduler.run("a", lambda: job("first")))]
+        await asyncio.sleep(0)
+        for key, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]:
+            tasks.append(asyncio.create_task(scheduler.run(key, lambda n=name: job(n))))
+            await asyncio.sleep(0)
+
+        assert scheduler.stats()["running"] == 1
+        assert scheduler.stats()["queued"] == 4
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.stats()["running"] == 0
+
+    asyncio.run(main())
+    # b waited behind a single turn of a, not behind a's whole burst
+    assert order == ["first", "a1", "b1", "a2", "a3"]
+
+
+def test_queue_full_and_position():
+    async def main():
+        scheduler = FairScheduler(concurrency=1, max_queue=1)
+        gate = asyncio.Event()
+        positions = []
+
+        async def on_queued(position):
+            positions.append(position)
+
+        running = asyncio.create_task(scheduler.run("a", gate.wait))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(scheduler.run("a", gate.wait, on_queued))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            await scheduler.run("a", gate.wait)
+
+        gate.set()
+        await asyncio.gather(running, queued)
+        assert positions == [1]
+        assert scheduler.stats()["rejected"] == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def main():
+        scheduler = FairScheduler(concurrency=1, max_queue=5)
+        gate = asyncio.Event()
+        running = asyncio.create_task(scheduler.run("a", gate.wait))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(scheduler.run("b", gate.wait))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 0
+
+        gate.set()
+        await running
+        assert scheduler.stats()["running"] == 0
+        assert await scheduler.run("c", lambda: asyncio.sleep(0)) is None
+
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import src.bot.core.SessionBackend as session_backends
+from src.bot.core.SessionStore import SessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    name = f"test-{uuid.uuid4()}"
+    path = str(tmp_path / "sessions.sqlite3")
+
+    def make(timeout=timedelta(minutes=15), **kwargs) -> SessionStore:
+        if request.param == "memory":
+            storage = session_backends.MemorySessions(name)
+        else:
+            storage = session_backends.SQLiteSessions(path, name)
+        return SessionStore(
+            storage, "test", timeout=timeout, retention=timedelta(days=1), **kwargs
+        )
+
+    return make
+
+
+def test_save_get_and_list(make_store):
+    async def main():
+        store = make_store()
+        await store.setup()
+        await store.save(1, 10, "a")
+        await store.save(2, 10, "b")
+        await store.save(3, 20, "c")
+        await asyncio.sleep(0.01)
+        store.touch(1)
+        assert [s["session_id"] for s in await store.list_guild(10)] == ["a", "b"]
+        await store.close()
+
+        store = make_store()
+        assert (await store.get(1))["session_id"] == "a"
+        assert await store.get(4) is None
+        assert await store.delete_guild(10) == 2
+        assert await store.get(2) is None
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_close_writes_pending_activity(make_store):
+    async def main():
+        store = make_store(flush_interval=60)
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        await store.save(1, 10, "a", long_ago)
+        store.touch(1)
+        await store.close()
+
+        store = make_store()
+        assert (await store.get(1))["last_active"] > long_ago
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_next_expired_skips_touched_and_purges_old(make_store):
+    async def main():
+        store = make_store(timeout=timedelta(minutes=15))
+        now = datetime.utcnow()
+        await store.save(1, 10, "expired", now - timedelta(minutes=20))
+        await store.save(2, 10, "touched", now - timedelta(minutes=20))
+        await store.save(3, 10, "active", now)
+        await store.save(4, 10, "past retention", now - timedelta(days=2))
+        await store.close()
+
+        store = make_store(timeout=timedelta(minutes=15))
+        store.touch(2)
+        await store.load_deadlines()
+        assert store.thread_ids == {1, 2, 3}
+
+        expired = await asyncio.wait_for(store.next_expired(), 1)
+        assert [s["session_id"] for s in expired] == ["expired"]
+        await store.delete(1)
+        assert store.thread_ids == {2, 3}
+        await store.close()
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from src.bot.utils import snapshot
+
+DATA = {"module": "test", "cache": {1: {"GUILD_ID": 1, "PREFIX": "!"}}}
+
+
+def test_round_trip():
+    raw = snapshot.dump_snapshot(snapshot.freeze(DATA))
+    assert raw.startswith(snapshot.MAGIC)
+    assert snapshot.load_snapshot(raw) == DATA
+
+
+def test_corrupted_payload_fails_the_checksum():
+    raw = bytearray(snapshot.dump_snapshot(snapshot.freeze(DATA)))
+    raw[-1] ^= 0xFF
+    with pytest.raises(ValueError, match="checksum"):
+        snapshot.load_snapshot(bytes(raw))
+
+
+def test_wrong_version_or_magic_is_rejected():
+    raw = bytearray(snapshot.dump_snapshot(snapshot.freeze(DATA)))
+    raw[len(snapshot.MAGIC)] = snapshot.VERSION + 1
+    with pytest.raises(ValueError, match="version"):
+        snapshot.load_snapshot(bytes(raw))
+    with pytest.raises(ValueError, match="not a snapshot"):
+        snapshot.load_snapshot(b"garbage")
+
+
+def test_write_and_read_file(tmp_path):
+    path = str(tmp_path / "gdm-test.snapshot")
+    snapshot.write_snapshot(path, snapshot.freeze(DATA))
+    assert snapshot.read_snapshot(path) == DATA
+    assert not os.path.exists(f"{path}.tmp")  # renamed into place
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "gdm-test.snapshot")
+    snapshot.write_snapshot(path, snapshot.freeze(DATA))
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        snapshot.write_snapshot(path, snapshot.freeze({"module": "other"}))
+    assert snapshot.read_snapshot(path) == DATA
+
+
+def test_missing_or_invalid_file_reads_as_none(tmp_path):
+    path = tmp_path / "gdm-test.snapshot"
+    assert snapshot.read_snapshot(str(path)) is None
+    path.write_bytes(b"garbage")
+    assert snapshot.read_snapshot(str(path)) is None